@@ -0,0 +1,315 @@
+import io
+import os
+import hmac
+import json
+import functools
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+from county_data import load_data, metric_column, DATA_PATH, BEDROOM_TYPES
+from compaction import compact_frame
+from metric_table import get_metric_table
+from spatial_index import get_spatial_index, points_to_counties, counties_in_boxes
+from ranking import get_rank_index, rank_counties, top_k_values
+from similarity import get_similarity_index, similar_counties
+from composite import get_composite_index, composite_scores, COMPOSITE_METRICS
+from export import export_metrics
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+class MetricQuery(BaseModel):
+    """Batch lookup request: fips to fetch (all counties if omitted), metrics and optional state filter"""
+    fips: Optional[List[str]] = None
+    metrics: List[str]
+    states: Optional[List[str]] = None
+    bedroom: str = "2-Bedroom"
+    format: str = "json"
+
+class PointQuery(BaseModel):
+    """Batched point-to-county lookup: parallel lon/lat arrays in EPSG:4326"""
+    lons: List[float]
+    lats: List[float]
+    metrics: List[str] = []
+    bedroom: str = "2-Bedroom"
+
+class BoxQuery(BaseModel):
+    """Batched viewport query: one [minx, miny, maxx, maxy] box per entry"""
+    boxes: List[List[float]]
+    metrics: List[str] = []
+    bedroom: str = "2-Bedroom"
+
+class SimilarQuery(BaseModel):
+    """Nearest-neighbour query: the county to match and an optional weighted feature subset"""
+    fips: str
+    k: int = Field(10, ge=1, le=5000)
+    metrics: Optional[List[str]] = None
+    weights: Optional[List[float]] = None
+    bedroom: str = "2-Bedroom"
+
+class CompositeQuery(BaseModel):
+    """Composite score query: {metric: weight} over COMPOSITE_METRICS, optionally only the top k"""
+    weights: Dict[str, float]
+    k: Optional[int] = Field(None, ge=1)
+    states: Optional[List[str]] = None
+    bedroom: str = "2-Bedroom"
+
+class RankPredicate(BaseModel):
+    """Keep only the top (order=desc) or bottom (order=asc) k counties by a metric"""
+    metric: str
+    k: int = Field(ge=1)
+    order: str = Field("desc", pattern="^(asc|desc)$")
+
+class ThresholdPredicate(BaseModel):
+    """Keep counties where metric <op> value, e.g. Crime Rate < 20"""
+    metric: str
+    op: str
+    value: float
+
+class ExportQuery(BaseModel):
+    """Bulk export of a filtered metric slice as chunked CSV or Parquet"""
+    metrics: List[str]
+    states: Optional[List[str]] = None
+    rank: Optional[RankPredicate] = None
+    thresholds: List[ThresholdPredicate] = []
+    bedroom: str = "2-Bedroom"
+    format: str = Field("csv", pattern="^(csv|parquet)$")
+    geometry: bool = False
+    simplify: float = Field(0.0, ge=0)
+
+class RefreshQuery(BaseModel):
+    """Columns of the metrics artifact rewritten by an incremental update"""
+    columns: List[str]
+
+def compute_etag(version, payload):
+    """Strong ETag derived from the table version and the canonical request payload"""
+    body = json.dumps(payload, sort_keys=True, default=str)
+    return '"' + hashlib.blake2b((version + body).encode(), digest_size=16).hexdigest() + '"'
+
+def not_modified(request, etag):
+    """True if the client's If-None-Match already covers this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    tags = [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+    return "*" in tags or etag in tags
+
+def _json_stream(table, positions, resolved, missing):
+    """Stream a JSON document row chunk by row chunk"""
+    yield '{"metrics": ' + json.dumps([name for name, _ in resolved]) + \
+        ', "missing": ' + json.dumps(missing) + ', "rows": ['
+    first = True
+    for records in table.records(positions, resolved):
+        yield ("" if first else ", ") + json.dumps(records)[1:-1]
+        first = False
+    yield "]}"
+
+def _arrow_stream(table, positions, resolved, chunk_size=50000):
+    """Stream an Arrow IPC stream with one record batch per chunk"""
+    names = ['fips', 'state_name', 'county_name'] + [name for name, _ in resolved]
+    schema = pa.schema(
+        [(name, pa.string()) for name in names[:3]] +
+        [(name, pa.from_numpy_dtype(table.columns[column].dtype)) for name, (_, column) in zip(names[3:], resolved)]
+    )
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for start in range(0, len(positions), chunk_size):
+        chunk = positions[start:start + chunk_size]
+        arrays = [
+            pa.array(table.fips[chunk], type=pa.string(), from_pandas=True),
+            pa.array(table.state_name[chunk], type=pa.string(), from_pandas=True),
+            pa.array(table.county_name[chunk], type=pa.string(), from_pandas=True),
+        ] + [pa.array(table.columns[column][chunk], from_pandas=True) for _, column in resolved]
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+@functools.lru_cache(maxsize=None)
+def geojson_body(state=None):
+    """Serialized county GeoJSON, national or culled to a state's viewport, built once per state"""
+    index = get_spatial_index()
+    bounds = index.state_bounds(state) if state else None
+    return index.viewport_geojson(bounds).encode()
+
+def refresh_caches(columns):
+    """
+    Reloads changed columns from the metrics artifact into the cached table and rebuilds only
+    the caches that read them. Polygons and the spatial index are kept unless geometry changed.
+    """
+    if 'geometry' in columns:
+        for cache in (load_data, get_metric_table, get_spatial_index, geojson_body,
+                      get_rank_index, get_similarity_index, get_composite_index):
+            cache.cache_clear()
+        return sorted(columns)
+
+    gdf, _ = load_data()
+    columns = [col for col in columns if col in gdf.columns and col != 'fips']
+    fresh = pd.read_csv(DATA_PATH, dtype={'fips': str}, usecols=['fips'] + columns)
+    fresh, _ = compact_frame(fresh, DATA_PATH, verbose=False)
+    fresh = fresh.drop_duplicates(subset='fips').set_index('fips')
+    for col in columns:
+        gdf[col] = fresh[col].reindex(gdf['fips']).set_axis(gdf.index)
+
+    table = get_metric_table()
+    table.update_columns(fresh)
+    metric_columns = [col for col in columns if col in table.columns]
+    if get_rank_index.cache_info().currsize:
+        if {'state_name', 'county_name'} & set(columns):
+            get_rank_index.cache_clear()
+        else:
+            for col in metric_columns:
+                get_rank_index().build(col)
+    if get_similarity_index.cache_info().currsize:
+        for col in metric_columns:
+            get_similarity_index().update(col)
+    composite_columns = {metric_column(metric, bedroom) for metric in COMPOSITE_METRICS for bedroom in BEDROOM_TYPES}
+    if composite_columns & set(metric_columns):
+        get_composite_index.cache_clear()
+    return columns
+
+def refresh_allowed(request):
+    """
+    /api/refresh drops shared caches, so it needs the REFRESH_TOKEN (sent as X-Refresh-Token) when one
+    is configured, and is otherwise limited to clients on this machine
+    """
+    token = os.getenv("REFRESH_TOKEN")
+    if token:
+        return hmac.compare_digest(request.headers.get("x-refresh-token", ""), token)
+    return request.client is not None and request.client.host in LOOPBACK_HOSTS
+
+def respond(request, query):
+    """Answer a metric query as streamed JSON or Arrow, honouring conditional requests"""
+    table = get_metric_table()
+    try:
+        resolved = table.resolve_metrics(query.metrics, query.bedroom)
+    except (ValueError, KeyError, IndexError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    use_arrow = query.format == "arrow" or ARROW_MEDIA_TYPE in request.headers.get("accept", "")
+    etag = compute_etag(table.version, {**query.model_dump(), "format": "arrow" if use_arrow else "json"})
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    positions, missing = table.positions(query.fips, query.states)
+    if use_arrow:
+        return StreamingResponse(_arrow_stream(table, positions, resolved), media_type=ARROW_MEDIA_TYPE, headers=headers)
+    return StreamingResponse(_json_stream(table, positions, resolved, missing), media_type="application/json", headers=headers)
+
+def create_app():
+    """FastAPI app exposing the headless batch query endpoints"""
+    api = FastAPI(title="U.S. County SocioInsights API")
+
+    @api.post("/api/metrics")
+    def post_metrics(query: MetricQuery, request: Request):
+        return respond(request, query)
+
+    @api.get("/api/metrics")
+    def get_metrics(
+        request: Request,
+        metrics: List[str] = Query(...),
+        fips: Optional[List[str]] = Query(None),
+        states: Optional[List[str]] = Query(None),
+        bedroom: str = "2-Bedroom",
+        format: str = "json",
+    ):
+        query = MetricQuery(fips=fips, metrics=metrics, states=states, bedroom=bedroom, format=format)
+        return respond(request, query)
+
+    @api.get("/api/geojson")
+    def geojson(request: Request, state: Optional[str] = None):
+        # Maps reference this URL instead of embedding polygons, so the browser fetches them once
+        etag = compute_etag(get_spatial_index().version, {"geojson": state})
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+        if not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        try:
+            body = geojson_body(state)
+        except ValueError:
+            raise HTTPException(status_code=404, detail=f"Unknown state: {state}")
+        return Response(body, media_type="application/geo+json", headers=headers)
+
+    @api.post("/api/lookup/points")
+    def lookup_points(query: PointQuery):
+        if len(query.lons) != len(query.lats):
+            raise HTTPException(status_code=400, detail="lons and lats must have the same length")
+        try:
+            return {"results": points_to_counties(query.lons, query.lats, query.metrics, query.bedroom)}
+        except (ValueError, KeyError, IndexError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @api.post("/api/lookup/boxes")
+    def lookup_boxes(query: BoxQuery):
+        if any(len(box) != 4 for box in query.boxes):
+            raise HTTPException(status_code=400, detail="boxes must be [minx, miny, maxx, maxy]")
+        try:
+            return {"results": counties_in_boxes(query.boxes, query.metrics, query.bedroom)}
+        except (ValueError, KeyError, IndexError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @api.get("/api/rank")
+    def rank(
+        metric: str,
+        k: int = Query(20, ge=1, le=5000),
+        state: Optional[str] = None,
+        order: str = Query("desc", pattern="^(asc|desc)$"),
+        bedroom: str = "2-Bedroom",
+    ):
+        try:
+            return {"results": rank_counties(metric, bedroom, k, state, ascending=order == "asc")}
+        except (ValueError, KeyError, IndexError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @api.post("/api/similar")
+    def similar(query: SimilarQuery):
+        try:
+            return {"results": similar_counties(query.fips, query.k, query.metrics, query.weights, query.bedroom)}
+        except (ValueError, KeyError, IndexError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @api.post("/api/composite")
+    def composite(query: CompositeQuery):
+        table = get_metric_table()
+        try:
+            scores = composite_scores(query.weights, query.bedroom)
+        except (ValueError, KeyError, IndexError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        positions, _ = table.positions(None, query.states)
+        if query.k is not None:
+            positions = top_k_values(scores, query.k, positions)
+        records = [record for chunk in table.records(positions, []) for record in chunk]
+        for record, score in zip(records, scores[positions]):
+            record['score'] = None if np.isnan(score) else float(score)
+        return {"results": records}
+
+    @api.post("/api/export")
+    def export(query: ExportQuery):
+        rank = (query.rank.metric, query.rank.k, query.rank.order == "asc") if query.rank else None
+        thresholds = [(t.metric, t.op, t.value) for t in query.thresholds]
+        try:
+            chunks, media_type = export_metrics(query.metrics, query.states, rank, thresholds, query.bedroom,
+                                                query.format, query.geometry, query.simplify)
+        except (ValueError, KeyError, IndexError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {"Content-Disposition": f'attachment; filename="county_metrics.{query.format}"'}
+        return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+    @api.post("/api/refresh")
+    def refresh(query: RefreshQuery, request: Request):
+        # Called by incremental.py --notify after a single-source update
+        if not refresh_allowed(request):
+            raise HTTPException(status_code=403, detail="Refresh requires REFRESH_TOKEN or a local client")
+        return {"refreshed": refresh_caches(query.columns)}
+
+    return api
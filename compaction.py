@@ -0,0 +1,98 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Column roles for compaction; any other numeric column is treated as a float metric
+FIPS_COLUMNS = {'fips'}
+CATEGORY_COLUMNS = {'state_name', 'county_name', 'NAME', 'States'}
+COUNT_COLUMNS = {
+    'population_in_poverty', 'total_population', 'total_vacant_housing_units',
+    'renters_50percent_plus_income', 'population_same_residence_1yr',
+    'population_25plus_bachelors', 'population_25plus_total'
+}
+
+# Largest absolute change accepted when narrowing a float64 column to float32: half a cent for dollar
+# amounts, and half the last digit of the finest dashboard format ({:.4f}) for every other metric.
+# float32 holds about 7 significant digits, so e.g. incomes above ~$84k keep their column at float64.
+DOLLAR_TOLERANCE = 0.005
+METRIC_TOLERANCE = 5e-5
+DOLLAR_COLUMNS = re.compile(
+    r"fmr_\d|fmr_vs_median_rent_diff_\d|affordability_gap_\d|housing_wage(_\d)?|min_wage|education_to_income"
+    r"|median_gross_rent|median_household_income|median_value_owner_occupied|median_zhvi\w*"
+)
+
+def float_tolerance(col):
+    """Absolute float32 tolerance for a column, by its role"""
+    return DOLLAR_TOLERANCE if DOLLAR_COLUMNS.fullmatch(str(col)) else METRIC_TOLERANCE
+
+def format_fips(values):
+    """Zero-padded 5-digit fips strings from integer or string fips values"""
+    return pd.Series(values).map(lambda f: f"{int(f):05d}" if pd.notna(f) and str(f).isdigit() else f).to_numpy(dtype=object)
+
+def _compact_fips(series):
+    keys = pd.to_numeric(series, errors='coerce')
+    # Leave the column alone if any fips is not a plain number
+    if series.notna().sum() != keys.notna().sum() or keys.max() >= np.iinfo(np.int32).max:
+        return series
+    return keys.astype('Int32') if keys.isna().any() else keys.astype('int32')
+
+def _compact_count(series, tolerance):
+    values = pd.to_numeric(series, errors='coerce')
+    present = values.dropna()
+    if not np.all(np.mod(present, 1) == 0):
+        return _compact_float(values, tolerance)
+    if present.empty or (present.abs().max() < np.iinfo(np.int32).max):
+        return values.astype('Int32')
+    return values.astype('Int64')
+
+def _compact_float(series, tolerance):
+    values = pd.to_numeric(series, errors='coerce').astype('float64')
+    narrowed = values.astype('float32')
+    original = values.to_numpy()
+    finite = np.isfinite(original)
+    # Precision policy: no overflow to inf and no value moving by more than the column's tolerance
+    if not np.array_equal(finite, np.isfinite(narrowed.to_numpy())):
+        return values
+    error = np.abs(narrowed.to_numpy()[finite].astype('float64') - original[finite])
+    if np.any(error > tolerance):
+        return values
+    return narrowed
+
+def compact_frame(df, name="frame", numeric=True, verbose=True):
+    """
+    Narrows each column of a DataFrame according to its role: integer fips keys, categorical
+    names, nullable integer counts and float32 metrics. Returns the compacted frame and a report.
+    numeric=False leaves counts and metrics as read, for tables that still feed metric arithmetic.
+    """
+    before = df.memory_usage(deep=True).sum()
+    df = df.copy()
+    kept_float64 = []
+    for col in df.columns:
+        if col == 'geometry' or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        if col in FIPS_COLUMNS:
+            df[col] = _compact_fips(df[col])
+        elif col in CATEGORY_COLUMNS:
+            df[col] = df[col].astype('category')
+        elif not numeric:
+            continue
+        elif col in COUNT_COLUMNS:
+            df[col] = _compact_count(df[col], float_tolerance(col))
+        elif pd.api.types.is_float_dtype(df[col]) or pd.api.types.is_integer_dtype(df[col]):
+            df[col] = _compact_float(df[col], float_tolerance(col))
+            if df[col].dtype == 'float64':
+                kept_float64.append(col)
+    after = df.memory_usage(deep=True).sum()
+
+    report = {
+        'name': name,
+        'bytes_before': int(before),
+        'bytes_after': int(after),
+        'bytes_saved': int(before - after),
+        'kept_float64': kept_float64,
+    }
+    if verbose:
+        print(f"Compacted {name}: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({(before - after) / 1e6:.2f} MB saved)")
+        if kept_float64:
+            print(f"  Kept float64 (precision policy): {', '.join(kept_float64)}")
+    return df, report
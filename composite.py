@@ -0,0 +1,58 @@
+import functools
+import numpy as np
+from county_data import METRIC_INFO, BEDROOM_TYPES
+from metric_table import get_metric_table
+
+COMPOSITE_METRICS = [
+    'Affordability Gap', 'Rent-to-Income Ratio', 'Cost Burden', 'Value to Income Ratio',
+    'Crime Rate', 'School Achievement', 'Unemployment Rate', 'Education to Income'
+]
+
+class CompositeIndex:
+    """Normalized metric matrix where each composite score is a single matrix-vector product"""
+
+    def __init__(self, table, metrics=COMPOSITE_METRICS, bedroom_type="2-Bedroom"):
+        self.table = table
+        self.metrics = list(metrics)
+        resolved = table.resolve_metrics(self.metrics, bedroom_type)
+        matrix = np.column_stack([table.columns[column] for _, column in resolved])
+
+        # Scale each metric to 0-1 between its 1st and 99th percentile so outliers don't flatten the rest,
+        # and flip lower-is-better metrics so 1 is always the favourable end
+        low, high = np.nanpercentile(matrix, [1, 99], axis=0)
+        span = np.where(high > low, high - low, 1)
+        scaled = np.clip((matrix - low) / span, 0, 1)
+        for i, metric in enumerate(self.metrics):
+            if metric in METRIC_INFO and not METRIC_INFO[metric]['higher_is_better']:
+                scaled[:, i] = 1 - scaled[:, i]
+
+        valid = ~np.isnan(scaled)
+        self.matrix = np.ascontiguousarray(np.where(valid, scaled, 0), dtype=np.float32)
+        self.valid = np.ascontiguousarray(valid, dtype=np.float32)
+
+    def score(self, weights):
+        """0-100 score per county; counties are scored on the weighted metrics they have"""
+        weights = np.asarray(weights, dtype=np.float32)
+        coverage = self.valid @ weights
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = 100 * (self.matrix @ weights) / coverage
+        scores[~(coverage > 0)] = np.nan
+        return scores
+
+@functools.lru_cache(maxsize=None)
+def get_composite_index(bedroom_type="2-Bedroom"):
+    """Build the composite index once per bedroom size from the metric table"""
+    # Unknown sizes raise before anything is cached, so the cache holds at most one index per BEDROOM_TYPES entry
+    if bedroom_type not in BEDROOM_TYPES:
+        raise ValueError(f"Unknown bedroom type: {bedroom_type}")
+    return CompositeIndex(get_metric_table(), bedroom_type=bedroom_type)
+
+def composite_scores(weights, bedroom_type="2-Bedroom"):
+    """Opportunity score for every county from a {metric: weight} mapping over COMPOSITE_METRICS"""
+    index = get_composite_index(bedroom_type)
+    unknown = set(weights) - set(index.metrics)
+    if unknown:
+        raise ValueError(f"Unknown composite metrics: {', '.join(sorted(unknown))}")
+    if any(weight < 0 for weight in weights.values()) or sum(weights.values()) <= 0:
+        raise ValueError("weights must be non-negative with at least one positive weight")
+    return index.score([weights.get(metric, 0) for metric in index.metrics])
@@ -0,0 +1,89 @@
+import geopandas as gpd
+import pandas as pd
+import functools
+from compaction import compact_frame
+
+DATA_PATH = "data/final_county_metrics.csv"
+
+NUMERIC_COLS = [
+    'pct_cost_burdened', 'pct_severe_cost_burdened', 'vacancy_to_population_ratio',
+    'population_in_poverty', 'education_to_income', 'Crime_Rate',
+    'school_achievement_score', 'unemployment_rate',
+    'value_to_income_ratio', 'poverty_to_rent_burden'
+] + [f'fmr_{i}' for i in range(5)] + [f'rent_to_income_ratio_{i}' for i in range(5)] + \
+    [f'fmr_vs_median_rent_diff_{i}' for i in range(5)] + [f'fmr_vs_median_rent_percent_{i}' for i in range(5)] + \
+    [f'affordability_gap_{i}' for i in range(5)] + [f'voucher_feasibility_{i}' for i in range(5)]
+
+BEDROOM_TYPES = ["0-Bedroom", "1-Bedroom", "2-Bedroom", "3-Bedroom", "4-Bedroom"]
+
+@functools.lru_cache(maxsize=None)
+def load_data():
+    """Load and validate geographic data from final_county_metrics.csv"""
+    df = pd.read_csv(DATA_PATH, dtype={'fips': str})
+    # Filter out rows where geometry is NaN or '0'
+    df = df[df['geometry'].notna() & (df['geometry'] != '0')]
+    df['geometry'] = gpd.GeoSeries.from_wkt(df['geometry'])
+    gdf = gpd.GeoDataFrame(df, crs="EPSG:4269")
+    gdf = gdf.to_crs(epsg=4326)
+
+    gdf[NUMERIC_COLS] = gdf[NUMERIC_COLS].apply(pd.to_numeric, errors='coerce')
+    gdf, _ = compact_frame(gdf, DATA_PATH)
+
+    # Get unique states, filter out invalid entries (like '0'), and sort
+    states = sorted(gdf['state_name'].dropna().unique().tolist())
+    states.insert(0, "USA")  # Add option for full U.S. view
+
+    return gdf, states
+
+METRIC_INFO = {
+    'FMR': {'format': '${:.2f}', 'description': 'Fair Market Rent set by HUD, representing the 40th percentile rent for standard-quality housing in a county. Lower is better for affordability, as it indicates lower rental costs.', 'prefix': '$', 'bedroom': True, 'higher_is_better': False},
+    'Rent-to-Income Ratio': {'format': '{:.1f}%', 'description': 'Annual FMR as a percentage of median household income, indicating rental affordability. Lower is better (ideally ≤30%), as higher ratios signal cost burden.', 'prefix': '', 'bedroom': True, 'higher_is_better': False},
+    'FMR vs Median Rent Difference': {'format': '${:.2f}', 'description': 'Dollar difference between Fair Market Rent and median gross rent, showing how subsidized rents compare to market rates. Lower is better if negative (FMR < median), indicating more affordable subsidized options.', 'prefix': '$', 'bedroom': True, 'higher_is_better': False},
+    'FMR Deviation (%)': {'format': '{:.1f}%', 'description': 'Percentage difference between FMR and median gross rent, reflecting the relative affordability of subsidized rents. Lower is better if negative, as it suggests FMR is more affordable than median rent.', 'prefix': '', 'bedroom': True, 'higher_is_better': False},
+    'Affordability Gap': {'format': '${:.2f}', 'description': 'Excess annual rent cost over 30% of median household income, measuring unaffordability. Lower is better (ideally $0), as higher gaps indicate greater financial strain.', 'prefix': '$', 'bedroom': True, 'higher_is_better': False},
+    'Voucher Feasibility': {'format': '{:.1f}%', 'description': 'FMR as a percentage of median gross rent, indicating how well housing vouchers cover market rents. Higher is better (ideally ≥100%), as it shows vouchers can meet or exceed market costs.', 'prefix': '', 'bedroom': True, 'higher_is_better': True},
+    'Cost Burden': {'format': '{:.1f}%', 'description': 'Percentage of renters spending more than 30% of their income on rent, a key affordability indicator. Lower is better, as higher percentages signal widespread housing cost stress.', 'prefix': '', 'bedroom': False, 'higher_is_better': False},
+    'Severe Cost Burden': {'format': '{:.1f}%', 'description': 'Percentage of renters spending more than 50% of their income on rent, indicating extreme housing cost pressure. Lower is better, as higher values highlight severe affordability challenges.', 'prefix': '', 'bedroom': False, 'higher_is_better': False},
+    'Vacancy Rate': {'format': '{:.4f}', 'description': 'Ratio of vacant housing units to total population, reflecting housing supply availability. Lower is generally better for market stability, but higher may indicate opportunities for agents in underutilized areas.', 'prefix': '', 'bedroom': False, 'higher_is_better': False},
+    'Poverty Population': {'format': '{:.0f}', 'description': 'Number of residents living below the poverty line, indicating economic need tied to housing affordability. Lower is better, as higher numbers suggest greater housing and financial strain.', 'prefix': '', 'bedroom': False, 'higher_is_better': False},
+    'Education to Income': {'format': '${:.2f}', 'description': 'Estimated income adjusted by the proportion of adults with bachelor’s degrees, reflecting economic potential. Higher is better, as it suggests stronger earning capacity, potentially supporting housing affordability.', 'prefix': '$', 'bedroom': False, 'higher_is_better': True},
+    'School Achievement': {'format': '{:.1f}', 'description': 'County-level school performance score, where 0 represents the national baseline (average performance across the U.S.). Higher is better, as scores above 0 indicate above-average educational outcomes, which can enhance community desirability and property values.', 'prefix': '', 'bedroom': False, 'higher_is_better': True},
+    'Unemployment Rate': {'format': '{:.1f}%', 'description': 'Percentage of the workforce that is unemployed, indicating economic health. Lower is better, as higher rates suggest weaker job markets, potentially impacting housing demand and affordability.', 'prefix': '', 'bedroom': False, 'higher_is_better': False},
+    'Value to Income Ratio': {'format': '{:.1f}', 'description': 'Ratio of median home value to median household income, measuring homeownership affordability. Lower is better (ideally 2.5–3), as higher ratios indicate homes are less affordable relative to income.', 'prefix': '', 'bedroom': False, 'higher_is_better': False},
+    'Poverty to Rent Burden': {'format': '{:.2f}', 'description': 'Ratio of the poverty population to the annual median gross rent, indicating the burden of poverty on housing costs. Lower is better, as higher values suggest greater strain on low-income residents to afford housing.', 'prefix': '', 'bedroom': False, 'higher_is_better': False},
+    'Crime Rate': {'format': '{:.2f}', 'description': 'Scaled crime ratio (total crimes divided by population, scaled from 0-100), indicating safety and security. Lower is better as higher values reflect greater crime levels, reducing community desirability.', 'prefix': '', 'bedroom': False, 'higher_is_better': False}
+}
+
+PERCENTAGE_METRICS = {
+    'Rent-to-Income Ratio', 'FMR Deviation (%)', 'Voucher Feasibility',
+    'Cost Burden', 'Severe Cost Burden', 'Unemployment Rate'
+}
+
+# Column templates for each metric; bedroom metrics are filled with the bedroom count
+METRIC_COLUMNS = {
+    'FMR': 'fmr_{}',
+    'Rent-to-Income Ratio': 'rent_to_income_ratio_{}',
+    'FMR vs Median Rent Difference': 'fmr_vs_median_rent_diff_{}',
+    'FMR Deviation (%)': 'fmr_vs_median_rent_percent_{}',
+    'Affordability Gap': 'affordability_gap_{}',
+    'Voucher Feasibility': 'voucher_feasibility_{}',
+    'Cost Burden': 'pct_cost_burdened',
+    'Severe Cost Burden': 'pct_severe_cost_burdened',
+    'Vacancy Rate': 'vacancy_to_population_ratio',
+    'Poverty Population': 'population_in_poverty',
+    'Education to Income': 'education_to_income',
+    'School Achievement': 'school_achievement_score',
+    'Unemployment Rate': 'unemployment_rate',
+    'Value to Income Ratio': 'value_to_income_ratio',
+    'Poverty to Rent Burden': 'poverty_to_rent_burden',
+    'Crime Rate': 'Crime_Rate'  # Scaled 0-100 crime ratio
+}
+
+def metric_column(metric_type, bedroom_type="2-Bedroom"):
+    """Map a METRIC_INFO name (plus bedroom size) to its column in the metrics table"""
+    if bedroom_type not in BEDROOM_TYPES:
+        raise ValueError(f"Unknown bedroom type: {bedroom_type}")
+    column = METRIC_COLUMNS[metric_type]
+    if METRIC_INFO[metric_type]['bedroom']:
+        column = column.format(int(bedroom_type[0]))
+    return column
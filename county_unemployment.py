@@ -92,6 +92,13 @@ if __name__ == "__main__":
     end_year = 2025
     bls_data = bls_client.fetch_laus_data(start_year, end_year, county_fips_list)
 
+    # Save the full monthly series for the time-series panels (see panel_store.py); M13 is the annual average
+    if not bls_data.empty:
+        monthly = bls_data[bls_data["month"] <= 12]
+        monthly = monthly.assign(period=monthly["year"].astype(str) + "-" + monthly["month"].astype(str).str.zfill(2))
+        monthly[["fips", "period", "unemployment_rate"]].to_csv("data/national_county_bls_unemployment_series.csv", index=False)
+        print("Monthly series saved to 'data/national_county_bls_unemployment_series.csv'")
+
     # Filter for the most recent complete month
     if not bls_data.empty:
         latest_data = bls_data[
@@ -1,63 +1,31 @@
 import gradio as gr
-import geopandas as gpd
-import pandas as pd
 import functools
+import tempfile
+import pandas as pd
+import numpy as np
+from urllib.parse import quote
 import plotly.graph_objects as go
+from county_data import load_data, metric_column, METRIC_INFO, PERCENTAGE_METRICS, BEDROOM_TYPES
+from spatial_index import get_spatial_index
+from ranking import rank_counties
+from similarity import similar_counties, DEFAULT_FEATURES
+from composite import composite_scores, COMPOSITE_METRICS
+from metric_table import get_metric_table
+from compaction import format_fips
+from panel_store import get_panel_store, PANEL_LABELS
+from export import export_metrics
 
-@functools.lru_cache(maxsize=None)
-def load_data():
-    """Load and validate geographic data from final_county_metrics.csv"""
-    df = pd.read_csv("data/final_county_metrics.csv", dtype={'fips': str})
-    # Filter out rows where geometry is NaN or '0'
-    df = df[df['geometry'].notna() & (df['geometry'] != '0')]
-    df['geometry'] = gpd.GeoSeries.from_wkt(df['geometry'])
-    gdf = gpd.GeoDataFrame(df, crs="EPSG:4269")
-    gdf = gdf.to_crs(epsg=4326)
-    
-    numeric_cols = [
-        'pct_cost_burdened', 'pct_severe_cost_burdened', 'vacancy_to_population_ratio',
-        'population_in_poverty', 'education_to_income', 'Crime_Rate',
-        'school_achievement_score', 'unemployment_rate',
-        'value_to_income_ratio', 'poverty_to_rent_burden'
-    ] + [f'fmr_{i}' for i in range(5)] + [f'rent_to_income_ratio_{i}' for i in range(5)] + \
-        [f'fmr_vs_median_rent_diff_{i}' for i in range(5)] + [f'fmr_vs_median_rent_percent_{i}' for i in range(5)] + \
-        [f'affordability_gap_{i}' for i in range(5)] + [f'voucher_feasibility_{i}' for i in range(5)]
-    
-    gdf[numeric_cols] = gdf[numeric_cols].apply(pd.to_numeric, errors='coerce')
-    
-    # Get unique states, filter out invalid entries (like '0'), and sort
-    states = sorted(gdf['state_name'].dropna().unique().tolist())
-    states.insert(0, "USA")  # Add option for full U.S. view
-    
-    return gdf, gdf.__geo_interface__, states
-
-METRIC_INFO = {
-    'FMR': {'format': '${:.2f}', 'description': 'Fair Market Rent set by HUD, representing the 40th percentile rent for standard-quality housing in a county. Lower is better for affordability, as it indicates lower rental costs.', 'prefix': '$', 'bedroom': True},
-    'Rent-to-Income Ratio': {'format': '{:.1f}%', 'description': 'Annual FMR as a percentage of median household income, indicating rental affordability. Lower is better (ideally ≤30%), as higher ratios signal cost burden.', 'prefix': '', 'bedroom': True},
-    'FMR vs Median Rent Difference': {'format': '${:.2f}', 'description': 'Dollar difference between Fair Market Rent and median gross rent, showing how subsidized rents compare to market rates. Lower is better if negative (FMR < median), indicating more affordable subsidized options.', 'prefix': '$', 'bedroom': True},
-    'FMR Deviation (%)': {'format': '{:.1f}%', 'description': 'Percentage difference between FMR and median gross rent, reflecting the relative affordability of subsidized rents. Lower is better if negative, as it suggests FMR is more affordable than median rent.', 'prefix': '', 'bedroom': True},
-    'Affordability Gap': {'format': '${:.2f}', 'description': 'Excess annual rent cost over 30% of median household income, measuring unaffordability. Lower is better (ideally $0), as higher gaps indicate greater financial strain.', 'prefix': '$', 'bedroom': True},
-    'Voucher Feasibility': {'format': '{:.1f}%', 'description': 'FMR as a percentage of median gross rent, indicating how well housing vouchers cover market rents. Higher is better (ideally ≥100%), as it shows vouchers can meet or exceed market costs.', 'prefix': '', 'bedroom': True},
-    'Cost Burden': {'format': '{:.1f}%', 'description': 'Percentage of renters spending more than 30% of their income on rent, a key affordability indicator. Lower is better, as higher percentages signal widespread housing cost stress.', 'prefix': '', 'bedroom': False},
-    'Severe Cost Burden': {'format': '{:.1f}%', 'description': 'Percentage of renters spending more than 50% of their income on rent, indicating extreme housing cost pressure. Lower is better, as higher values highlight severe affordability challenges.', 'prefix': '', 'bedroom': False},
-    'Vacancy Rate': {'format': '{:.4f}', 'description': 'Ratio of vacant housing units to total population, reflecting housing supply availability. Lower is generally better for market stability, but higher may indicate opportunities for agents in underutilized areas.', 'prefix': '', 'bedroom': False},
-    'Poverty Population': {'format': '{:.0f}', 'description': 'Number of residents living below the poverty line, indicating economic need tied to housing affordability. Lower is better, as higher numbers suggest greater housing and financial strain.', 'prefix': '', 'bedroom': False},
-    'Education to Income': {'format': '${:.2f}', 'description': 'Estimated income adjusted by the proportion of adults with bachelor’s degrees, reflecting economic potential. Higher is better, as it suggests stronger earning capacity, potentially supporting housing affordability.', 'prefix': '$', 'bedroom': False},
-    'School Achievement': {'format': '{:.1f}', 'description': 'County-level school performance score, where 0 represents the national baseline (average performance across the U.S.). Higher is better, as scores above 0 indicate above-average educational outcomes, which can enhance community desirability and property values.', 'prefix': '', 'bedroom': False},
-    'Unemployment Rate': {'format': '{:.1f}%', 'description': 'Percentage of the workforce that is unemployed, indicating economic health. Lower is better, as higher rates suggest weaker job markets, potentially impacting housing demand and affordability.', 'prefix': '', 'bedroom': False},
-    'Value to Income Ratio': {'format': '{:.1f}', 'description': 'Ratio of median home value to median household income, measuring homeownership affordability. Lower is better (ideally 2.5–3), as higher ratios indicate homes are less affordable relative to income.', 'prefix': '', 'bedroom': False},
-    'Poverty to Rent Burden': {'format': '{:.2f}', 'description': 'Ratio of the poverty population to the annual median gross rent, indicating the burden of poverty on housing costs. Lower is better, as higher values suggest greater strain on low-income residents to afford housing.', 'prefix': '', 'bedroom': False},
-    'Crime Rate': {'format': '{:.2f}', 'description': 'Scaled crime ratio (total crimes divided by population, scaled from 0-100), indicating safety and security. Lower is better as higher values reflect greater crime levels, reducing community desirability.', 'prefix': '', 'bedroom': False}
-}
-
-PERCENTAGE_METRICS = {
-    'Rent-to-Income Ratio', 'FMR Deviation (%)', 'Voucher Feasibility', 
-    'Cost Burden', 'Severe Cost Burden', 'Unemployment Rate'
-}
+GEOJSON_URL = "/api/geojson"
+
+def geojson_url(state=None):
+    """URL of the county GeoJSON served by the API, culled to the state viewport if given"""
+    if state and state != "USA":
+        return f"{GEOJSON_URL}?state={quote(state)}"
+    return GEOJSON_URL
 
 def create_map(bedroom_type, metric_type, state=None):
     """Generate interactive choropleth map with optional state zoom"""
-    gdf, geojson, states = load_data()
+    gdf, states = load_data()
     
     # Filter by state if specified, otherwise use full USA
     if state and state != "USA":
@@ -65,28 +33,7 @@ def create_map(bedroom_type, metric_type, state=None):
         if gdf.empty:
             return go.Figure()  # Return empty figure if no data for state
     
-    bedroom_num = int(bedroom_type[0]) if METRIC_INFO[metric_type]['bedroom'] else None
-    
-    metric_mapping = {
-        'FMR': f'fmr_{bedroom_num}',
-        'Rent-to-Income Ratio': f'rent_to_income_ratio_{bedroom_num}',
-        'FMR vs Median Rent Difference': f'fmr_vs_median_rent_diff_{bedroom_num}',
-        'FMR Deviation (%)': f'fmr_vs_median_rent_percent_{bedroom_num}',
-        'Affordability Gap': f'affordability_gap_{bedroom_num}',
-        'Voucher Feasibility': f'voucher_feasibility_{bedroom_num}',
-        'Cost Burden': 'pct_cost_burdened',
-        'Severe Cost Burden': 'pct_severe_cost_burdened',
-        'Vacancy Rate': 'vacancy_to_population_ratio',
-        'Poverty Population': 'population_in_poverty',
-        'Education to Income': 'education_to_income',
-        'School Achievement': 'school_achievement_score',
-        'Unemployment Rate': 'unemployment_rate',
-        'Value to Income Ratio': 'value_to_income_ratio',
-        'Poverty to Rent Burden': 'poverty_to_rent_burden',
-        'Crime Rate': 'Crime_Rate'  # Assuming Crime_Rate is now the scaled ratio (0-100)
-    }
-    
-    metric_col = metric_mapping[metric_type]
+    metric_col = metric_column(metric_type, bedroom_type)
     format_str = METRIC_INFO[metric_type]['format']
     
     gdf['hover_text'] = gdf.apply(
@@ -110,9 +57,10 @@ def create_map(bedroom_type, metric_type, state=None):
         zmin = None
         zmax = None
 
+    # The browser fetches (and caches) the polygons from the API instead of receiving them with every figure
     fig = go.Figure(go.Choropleth(
-        geojson=geojson,
-        locations=gdf['fips'],
+        geojson=geojson_url(state),
+        locations=format_fips(gdf['fips']),
         z=z,
         zmin=zmin,
         zmax=zmax,
@@ -134,8 +82,14 @@ def create_map(bedroom_type, metric_type, state=None):
 
     # Update layout for state zoom or USA view
     if state and state != "USA":
-        # Get state bounds for zoom
-        state_bounds = gdf.total_bounds  # [minx, miny, maxx, maxy]
+        update_geo_layout(fig, gdf.total_bounds)
+    else:
+        update_geo_layout(fig)
+    return fig
+
+def update_geo_layout(fig, state_bounds=None):
+    """Apply the shared map layout, zoomed to state_bounds ([minx, miny, maxx, maxy]) if given"""
+    if state_bounds is not None:
         fig.update_layout(
             geo=dict(
                 scope='usa',
@@ -165,11 +119,114 @@ def create_map(bedroom_type, metric_type, state=None):
         font=dict(family="Arial", color="#333333"),
         paper_bgcolor='#ffffff'
     )
+
+def create_composite_map(bedroom_type, state, *weights):
+    """Choropleth of the weighted opportunity score, rescored from the slider weights"""
+    table = get_metric_table()
+    if not any(weights):
+        return go.Figure()  # Every slider at zero leaves nothing to score
+    scores = composite_scores(dict(zip(COMPOSITE_METRICS, weights)), bedroom_type)
+
+    positions = np.arange(len(table))
+    if state and state != "USA":
+        positions = np.flatnonzero(table.state_name == state)
+        if len(positions) == 0:
+            return go.Figure()
+        state_bounds = get_spatial_index().state_bounds(state)
+
+    z = scores[positions]
+    hover_text = [
+        f"<b>{county}</b><br>State: {state_name}<br>Opportunity Score: {score:.1f}" if score == score else ""
+        for county, state_name, score in zip(table.county_name[positions], table.state_name[positions], z)
+    ]
+    fig = go.Figure(go.Choropleth(
+        geojson=geojson_url(state),
+        locations=table.fips[positions],
+        z=z,
+        zmin=0,
+        zmax=100,
+        featureidkey="properties.fips",
+        colorscale='Viridis',
+        marker_line_width=0.5,
+        marker_line_color='white',
+        hoverinfo="text",
+        hovertext=hover_text,
+        colorbar=dict(title="Opportunity Score", thickness=15, tickfont=dict(size=12))
+    ))
+    update_geo_layout(fig, state_bounds if state and state != "USA" else None)
+    return fig
+
+@functools.lru_cache(maxsize=32)
+def create_time_map(panel_label, state=None):
+    """
+    Choropleth with one animation frame per period. Frames carry only the z-vector, so the
+    slider and play button step through periods in the browser without rebuilding the figure.
+    """
+    store = get_panel_store()
+    if store is None or not panel_label:
+        return go.Figure()
+    metric = {label: metric for metric, label in PANEL_LABELS.items()}.get(panel_label, panel_label)
+    panel = store.panels[metric]
+    periods = store.periods[metric]
+
+    # County and state names come from the metric table
+    table = get_metric_table()
+    rows = table.index.get_indexer(store.fips.astype('int64'))
+    state_names = np.where(rows >= 0, table.state_name[rows], None)
+    county_names = np.where(rows >= 0, table.county_name[rows], store.fips)
+
+    positions = np.arange(len(store.fips))
+    if state and state != "USA":
+        positions = np.flatnonzero(state_names == state)
+        if len(positions) == 0:
+            return go.Figure()
+    panel = panel[:, positions]
+    zmin, zmax = np.nanpercentile(panel, [1, 99]) if np.isfinite(panel).any() else (None, None)
+
+    fig = go.Figure(
+        go.Choropleth(
+            geojson=geojson_url(state),
+            locations=store.fips[positions],
+            z=panel[-1],
+            zmin=zmin,
+            zmax=zmax,
+            featureidkey="properties.fips",
+            colorscale='Viridis',
+            marker_line_width=0.5,
+            marker_line_color='white',
+            text=[f"<b>{county}</b><br>State: {state_name}" for county, state_name in zip(county_names[positions], state_names[positions])],
+            hovertemplate="%{text}<br>" + panel_label + ": %{z:,.2f}<extra></extra>",
+            colorbar=dict(title=panel_label, thickness=15, tickfont=dict(size=12))
+        ),
+        frames=[go.Frame(data=[go.Choropleth(z=panel[i])], name=period) for i, period in enumerate(periods)]
+    )
+    update_geo_layout(fig, get_spatial_index().state_bounds(state) if state and state != "USA" else None)
+
+    step_args = dict(mode="immediate", frame=dict(duration=0, redraw=True), transition=dict(duration=0))
+    fig.update_layout(
+        margin=dict(r=0, t=40, l=0, b=80),
+        updatemenus=[dict(
+            type="buttons",
+            showactive=False,
+            x=0, y=0, xanchor="left", yanchor="top", pad=dict(t=40),
+            buttons=[
+                dict(label="Play", method="animate",
+                     args=[None, dict(frame=dict(duration=400, redraw=True), fromcurrent=True, transition=dict(duration=0))]),
+                dict(label="Pause", method="animate", args=[[None], step_args])
+            ]
+        )],
+        sliders=[dict(
+            active=len(periods) - 1,
+            x=0.1, len=0.9, pad=dict(t=40),
+            currentvalue=dict(prefix="Period: "),
+            steps=[dict(method="animate", label=period, args=[[period], step_args]) for period in periods]
+        )]
+    )
     return fig
 
 def get_stats(bedroom_type, metric_type, state=None):
     """Calculate statistics with county info for min/max, filtered by state if specified"""
-    gdf, _, _ = load_data()
+    gdf, _ = load_data()
     
     # Filter by state if specified, otherwise use full USA
     if state and state != "USA":
@@ -180,28 +237,7 @@ def get_stats(bedroom_type, metric_type, state=None):
                 0, "N/A", "N/A", "N/A"
             ]
     
-    bedroom_num = int(bedroom_type[0]) if METRIC_INFO[metric_type]['bedroom'] else None
-    
-    metric_mapping = {
-        'FMR': f'fmr_{bedroom_num}',
-        'Rent-to-Income Ratio': f'rent_to_income_ratio_{bedroom_num}',
-        'FMR vs Median Rent Difference': f'fmr_vs_median_rent_diff_{bedroom_num}',
-        'FMR Deviation (%)': f'fmr_vs_median_rent_percent_{bedroom_num}',
-        'Affordability Gap': f'affordability_gap_{bedroom_num}',
-        'Voucher Feasibility': f'voucher_feasibility_{bedroom_num}',
-        'Cost Burden': 'pct_cost_burdened',
-        'Severe Cost Burden': 'pct_severe_cost_burdened',
-        'Vacancy Rate': 'vacancy_to_population_ratio',
-        'Poverty Population': 'population_in_poverty',
-        'Education to Income': 'education_to_income',
-        'School Achievement': 'school_achievement_score',
-        'Unemployment Rate': 'unemployment_rate',
-        'Value to Income Ratio': 'value_to_income_ratio',
-        'Poverty to Rent Burden': 'poverty_to_rent_burden',
-        'Crime Rate': 'Crime_Rate'  # Now reflects the scaled 0-100 ratio
-    }
-    
-    metric_col = metric_mapping[metric_type]
+    metric_col = metric_column(metric_type, bedroom_type)
     gdf = gdf.dropna(subset=[metric_col])
     format_str = METRIC_INFO[metric_type]['format']
     
@@ -226,6 +262,53 @@ def get_stats(bedroom_type, metric_type, state=None):
         format_str.format(gdf[metric_col].quantile(0.75))
     ]
 
+def get_rankings(bedroom_type, metric_type, state=None, direction="Highest", k=10):
+    """Ranking table of the top or bottom k counties, filtered by state if specified"""
+    state = state if state and state != "USA" else None
+    format_str = METRIC_INFO[metric_type]['format']
+    records = rank_counties(metric_type, bedroom_type, int(k), state, ascending=direction == "Lowest")
+    return [
+        [
+            record['rank'],
+            record['county_name'],
+            record['state_name'],
+            format_str.format(record[metric_type]),
+            f"{record['state_percentile' if state else 'national_percentile']:.1f}"
+        ]
+        for record in records
+    ]
+
+def county_choices():
+    """(label, fips) dropdown choices for every county"""
+    gdf, _ = load_data()
+    counties = gdf[['county_name', 'state_name', 'fips']].dropna().sort_values(['state_name', 'county_name'])
+    return [
+        (f"{county}, {state}", fips)
+        for county, state, fips in zip(counties['county_name'], counties['state_name'], format_fips(counties['fips']))
+    ]
+
+def get_similar(fips, features, bedroom_type, k=10):
+    """Table of the counties most similar to the selected county over the chosen metrics"""
+    if not fips or not features:
+        return []
+    records = similar_counties(fips, int(k), features, bedroom_type=bedroom_type)
+    return [
+        [record['county_name'], record['state_name'], f"{record['distance']:.2f}"]
+        for record in records
+    ]
+
+def export_slice(bedroom_type, metric_type, state, direction, k, metrics, file_format, geometry, top_only):
+    """Stream the selected slice to a temporary file for download"""
+    states = [state] if state and state != "USA" else None
+    rank = (metric_type, int(k), direction == "Lowest") if top_only else None
+    extension = 'parquet' if file_format == "Parquet" else 'csv'
+    chunks, _ = export_metrics(metrics or [metric_type], states, rank, bedroom_type=bedroom_type,
+                               format=extension, geometry=geometry, simplify=0.01 if geometry else 0.0)
+    with tempfile.NamedTemporaryFile(mode='wb', suffix=f".{extension}", prefix="county_metrics_", delete=False) as f:
+        for chunk in chunks:
+            f.write(chunk.encode() if isinstance(chunk, str) else chunk)
+    return f.name
+
 # Metric definition table
 ALL_METRICS_DISPLAY = """
 ### Metric Definitions
@@ -277,13 +360,13 @@ with gr.Blocks(theme=theme, css=css, title="U.S. Housing Market Analysis") as ap
         with gr.Column(scale=1):
             with gr.Group(elem_classes="stats-panel"):
                 state_select = gr.Dropdown(
-                    choices=load_data()[2],  # Use cached states, ensuring no "0"
+                    choices=load_data()[1],  # Use cached states, ensuring no "0"
                     value="USA",
                     label="State",
                     visible=True
                 )
                 bedroom_select = gr.Dropdown(
-                    choices=["0-Bedroom", "1-Bedroom", "2-Bedroom", "3-Bedroom", "4-Bedroom"],
+                    choices=BEDROOM_TYPES,
                     value="2-Bedroom",
                     label="Bedroom Size",
                     visible=True
@@ -305,6 +388,78 @@ with gr.Blocks(theme=theme, css=css, title="U.S. Housing Market Analysis") as ap
         with gr.Column(scale=2):
             with gr.Group(elem_classes="map-container"):
                 map_output = gr.Plot(label="Geographic Distribution")
+            with gr.Group(elem_classes="map-container"):
+                with gr.Row():
+                    rank_direction = gr.Radio(
+                        choices=["Highest", "Lowest"],
+                        value="Highest",
+                        label="Rank By"
+                    )
+                    rank_count = gr.Slider(
+                        minimum=5,
+                        maximum=50,
+                        step=5,
+                        value=10,
+                        label="Counties"
+                    )
+                ranking_output = gr.Dataframe(
+                    headers=["Rank", "County", "State", "Value", "Percentile"],
+                    label="County Rankings",
+                    interactive=False,
+                    wrap=True
+                )
+            with gr.Group(elem_classes="map-container"):
+                gr.Markdown("### Opportunity Score\nWeight the metrics below to build a composite score (0-100, higher is better).")
+                composite_weights = [
+                    gr.Slider(minimum=0, maximum=1, step=0.05, value=1, label=metric)
+                    for metric in COMPOSITE_METRICS
+                ]
+                composite_output = gr.Plot(label="Opportunity Score")
+            with gr.Group(elem_classes="map-container"):
+                panel_choices = [PANEL_LABELS.get(metric, metric) for metric in get_panel_store().panels] if get_panel_store() else []
+                panel_select = gr.Dropdown(
+                    choices=panel_choices,
+                    value=panel_choices[0] if panel_choices else None,
+                    label="Trends Over Time",
+                    info=None if panel_choices else "Run panel_store.py to build the time-series panels"
+                )
+                time_output = gr.Plot(label="Metric Over Time")
+            with gr.Group(elem_classes="map-container"):
+                export_metrics_select = gr.CheckboxGroup(
+                    choices=list(METRIC_INFO.keys()),
+                    value=[],
+                    label="Export Metrics (defaults to the selected metric)"
+                )
+                with gr.Row():
+                    export_format = gr.Radio(choices=["CSV", "Parquet"], value="CSV", label="Format")
+                    export_geometry = gr.Checkbox(value=False, label="Include simplified geometry")
+                    export_top_only = gr.Checkbox(value=False, label="Only ranked counties")
+                export_button = gr.Button("Export", variant="primary")
+                export_file = gr.File(label="Download")
+            with gr.Group(elem_classes="map-container"):
+                similar_county = gr.Dropdown(
+                    choices=county_choices(),
+                    label="Find Counties Similar To",
+                    filterable=True
+                )
+                similar_features = gr.CheckboxGroup(
+                    choices=list(METRIC_INFO.keys()),
+                    value=DEFAULT_FEATURES,
+                    label="Compare On"
+                )
+                similar_count = gr.Slider(
+                    minimum=5,
+                    maximum=50,
+                    step=5,
+                    value=10,
+                    label="Counties"
+                )
+                similar_output = gr.Dataframe(
+                    headers=["County", "State", "Distance"],
+                    label="Similar Counties",
+                    interactive=False,
+                    wrap=True
+                )
 
     def update_display(bedroom_type, metric_type, state):
         """Update map, stats, and description based on selection"""
@@ -344,10 +499,65 @@ with gr.Blocks(theme=theme, css=css, title="U.S. Housing Market Analysis") as ap
         outputs=outputs
     )
 
+    ranking_inputs = inputs + [rank_direction, rank_count]
+    for input_elem in ranking_inputs:
+        input_elem.change(
+            get_rankings,
+            inputs=ranking_inputs,
+            outputs=ranking_output
+        )
+
+    similar_inputs = [similar_county, similar_features, bedroom_select, similar_count]
+    for input_elem in similar_inputs:
+        input_elem.change(
+            get_similar,
+            inputs=similar_inputs,
+            outputs=similar_output
+        )
+
+    composite_inputs = [bedroom_select, state_select] + composite_weights
+    for input_elem in composite_inputs:
+        input_elem.change(
+            create_composite_map,
+            inputs=composite_inputs,
+            outputs=composite_output
+        )
+
+    for input_elem in [panel_select, state_select]:
+        input_elem.change(
+            create_time_map,
+            inputs=[panel_select, state_select],
+            outputs=time_output
+        )
+
+    export_button.click(
+        export_slice,
+        inputs=[bedroom_select, metric_select, state_select, rank_direction, rank_count,
+                export_metrics_select, export_format, export_geometry, export_top_only],
+        outputs=export_file
+    )
+
     app.load(
         fn=lambda: update_display("2-Bedroom", "Cost Burden", "USA"),
         outputs=outputs
     )
+    app.load(
+        fn=lambda: get_rankings("2-Bedroom", "Cost Burden", "USA"),
+        outputs=ranking_output
+    )
+    app.load(
+        fn=lambda: create_composite_map("2-Bedroom", "USA", *[1] * len(COMPOSITE_METRICS)),
+        outputs=composite_output
+    )
+    app.load(
+        fn=lambda: create_time_map(panel_choices[0] if panel_choices else None, "USA"),
+        outputs=time_output
+    )
 
 if __name__ == "__main__":
-    app.launch(share = True)
\ No newline at end of file
+    import uvicorn
+    from api import create_app
+
+    # Serve the batch query API and the dashboard from the same process
+    server = gr.mount_gradio_app(create_app(), app, path="/")
+    uvicorn.run(server, host="0.0.0.0", port=7860)
\ No newline at end of file
@@ -0,0 +1,110 @@
+import io
+import csv
+import numpy as np
+import shapely
+import pyarrow as pa
+import pyarrow.parquet as pq
+from metric_table import get_metric_table
+from ranking import get_rank_index, top_k_values
+from spatial_index import get_spatial_index
+
+OPERATORS = {
+    '<': np.less, '<=': np.less_equal, '>': np.greater,
+    '>=': np.greater_equal, '==': np.equal, '!=': np.not_equal,
+}
+
+EXPORT_CHUNK_SIZE = 10000
+
+def select_positions(table, states=None, rank=None, thresholds=(), bedroom_type="2-Bedroom"):
+    """
+    Row positions matching the state filter, every (metric, op, value) threshold and an
+    optional (metric, k, ascending) rank predicate, without materializing any DataFrame.
+    """
+    positions, _ = table.positions(None, states)
+    for metric, op, value in thresholds:
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator: {op}")
+        (_, column), = table.resolve_metrics([metric], bedroom_type)
+        values = table.columns[column][positions]
+        # Counties without data never match a threshold (NaN != value would otherwise keep them)
+        positions = positions[OPERATORS[op](values, value) & ~np.isnan(values)]
+    if rank:
+        metric, k, ascending = rank
+        (_, column), = table.resolve_metrics([metric], bedroom_type)
+        if not thresholds and (not states or len(states) == 1):
+            # National or single-state ranks come straight from the precomputed orders
+            positions = get_rank_index().top_k(column, k, states[0] if states else None, ascending)
+        else:
+            positions = top_k_values(table.columns[column], k, positions, ascending)
+    return positions
+
+def _names(resolved, geometry=False):
+    """Output column names, shared by every chunk and by the header of an empty export"""
+    return ['fips', 'state_name', 'county_name'] + [name for name, _ in resolved] + (['geometry'] if geometry else [])
+
+def _chunks(table, positions, resolved, geometry=False, simplify=0.0):
+    """Yield (names, columns) for each chunk of rows; only one chunk is held in memory at a time"""
+    names = _names(resolved, geometry)
+    if geometry:
+        geometries = get_spatial_index().table_geometry
+    for start in range(0, len(positions), EXPORT_CHUNK_SIZE):
+        chunk = positions[start:start + EXPORT_CHUNK_SIZE]
+        columns = [table.fips[chunk], table.state_name[chunk], table.county_name[chunk]] + \
+            [table.values(column, chunk) for _, column in resolved]
+        if geometry:
+            geoms = geometries[chunk]
+            if simplify:
+                geoms = shapely.simplify(geoms, simplify, preserve_topology=True)
+            columns.append(shapely.to_wkt(geoms, rounding_precision=6))
+        yield names, columns
+
+def stream_csv(table, positions, resolved, geometry=False, simplify=0.0):
+    """Yield CSV text chunk by chunk, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header = True
+    for names, columns in _chunks(table, positions, resolved, geometry, simplify):
+        if header:
+            writer.writerow(names)
+            header = False
+        writer.writerows(zip(*columns))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if header:
+        writer.writerow(_names(resolved, geometry))
+        yield buffer.getvalue()
+
+def stream_parquet(table, positions, resolved, geometry=False, simplify=0.0):
+    """Yield a Parquet file as bytes, one row group per chunk"""
+    dtypes = [pa.from_numpy_dtype(table.columns[column].dtype) for _, column in resolved]
+    types = [pa.string()] * 3 + dtypes + ([pa.string()] if geometry else [])
+    schema = pa.schema(list(zip(_names(resolved, geometry), types)))
+    sink = io.BytesIO()
+    writer = pq.ParquetWriter(sink, schema)
+    for _, columns in _chunks(table, positions, resolved, geometry, simplify):
+        arrays = [pa.array(values, type=field.type, from_pandas=True) for values, field in zip(columns, schema)]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'parquet': (stream_parquet, 'application/vnd.apache.parquet'),
+}
+
+def export_metrics(metrics, states=None, rank=None, thresholds=(), bedroom_type="2-Bedroom",
+                   format='csv', geometry=False, simplify=0.0):
+    """Resolve an export request and return (chunk iterator, media type)"""
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {format}")
+    if simplify < 0:
+        raise ValueError("simplify must be non-negative")
+    table = get_metric_table()
+    resolved = table.resolve_metrics(metrics, bedroom_type)
+    positions = select_positions(table, states, rank, thresholds, bedroom_type)
+    stream, media_type = EXPORT_FORMATS[format]
+    return stream(table, positions, resolved, geometry, simplify), media_type
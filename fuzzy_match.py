@@ -1,16 +1,7 @@
+import argparse
 import pandas as pd
 from rapidfuzz import process
-
-# Load and format data
-crime_df = pd.read_csv("data/crime_rate_by_county.csv")
-crime_df['fips'] = crime_df['fips'].astype(str).str.zfill(5)
-
-census_df = pd.read_csv("data/county_census_data.csv")
-census_df['fips'] = census_df['fips'].astype(str).str.zfill(5)
-
-# Extract 'States' column using the first two digits of FIPS
-crime_df['States'] = crime_df['fips'].str[:2]
-census_df['States'] = census_df['fips'].str[:2]
+from profiling import PipelineProfiler, profile_stage, add_profile_argument
 
 # Function to match Crime_Rate for each census FIPS
 def match_crime_rate(census_fips, census_state, crime_df):
@@ -35,18 +26,41 @@ def match_crime_rate(census_fips, census_state, crime_df):
 
     return None  # Return None if no match is found
 
-# Apply the matching logic to each census FIPS
-census_df['Crime_Rate'] = census_df.apply(
-    lambda row: match_crime_rate(row['fips'], row['States'], crime_df),
-    axis=1
-)
+parser = argparse.ArgumentParser(description="Match county crime rates onto the census counties by fips")
+add_profile_argument(parser, "fuzzy_match")
+args = parser.parse_args()
+
+with PipelineProfiler("fuzzy_match", args.profile):
+    # Load and format data
+    with profile_stage("load", label="data/crime_rate_by_county.csv, data/county_census_data.csv") as stage:
+        crime_df = pd.read_csv("data/crime_rate_by_county.csv")
+        census_df = pd.read_csv("data/county_census_data.csv")
+        stage.output = [crime_df, census_df]
+
+    with profile_stage("standardize", [crime_df, census_df]) as stage:
+        crime_df['fips'] = crime_df['fips'].astype(str).str.zfill(5)
+        census_df['fips'] = census_df['fips'].astype(str).str.zfill(5)
+
+        # Extract 'States' column using the first two digits of FIPS
+        crime_df['States'] = crime_df['fips'].str[:2]
+        census_df['States'] = census_df['fips'].str[:2]
+        stage.output = [crime_df, census_df]
+
+    # Apply the matching logic to each census FIPS
+    with profile_stage("merge", [crime_df, census_df], label="fuzzy match") as stage:
+        census_df['Crime_Rate'] = census_df.apply(
+            lambda row: match_crime_rate(row['fips'], row['States'], crime_df),
+            axis=1
+        )
 
-# Create final output DataFrame with only census_fips and Crime_Rate
-final_df = census_df[['fips', 'Crime_Rate']]
-final_df = final_df.dropna(subset=['Crime_Rate'])  # Drop rows where Crime_Rate is None
+        # Create final output DataFrame with only census_fips and Crime_Rate
+        final_df = census_df[['fips', 'Crime_Rate']]
+        final_df = final_df.dropna(subset=['Crime_Rate'])  # Drop rows where Crime_Rate is None
+        stage.output = final_df
 
-# Display results
-print(final_df)
+    # Display results
+    print(final_df)
 
-# Save output
-final_df.to_csv('data/fuzzy_matched_crime_data.csv', index=False)
\ No newline at end of file
+    # Save output
+    with profile_stage("write", final_df, label="data/fuzzy_matched_crime_data.csv"):
+        final_df.to_csv('data/fuzzy_matched_crime_data.csv', index=False)
@@ -0,0 +1,86 @@
+import os
+import argparse
+import pandas as pd
+import requests
+from compaction import format_fips
+from profiling import PipelineProfiler, profile_stage, add_profile_argument
+from main import (
+    SOURCES, INPUTS_PATH, FINAL_PATH, FINAL_COLUMNS, METRIC_DEPENDENCIES, STATE_MEDIAN_COLUMNS, OUTLIER_COLUMNS,
+    load_and_standardize_df, calculate_affordability_metrics, nullify_outliers_minimally
+)
+
+def _changed_mask(new, current):
+    """True where a value differs, treating two missing values as equal"""
+    new, current = new.astype(object), current.astype(object)
+    return ~((new == current) | (new.isna() & current.isna()))
+
+def incremental_update(source, inputs_path=INPUTS_PATH, final_path=FINAL_PATH):
+    """
+    Applies a refreshed source table to the stored inputs and recomputes only the metric
+    columns that depend on its changed columns, for the counties whose values changed.
+    Returns the final columns that were rewritten and the number of counties recomputed.
+    """
+    new_df = SOURCES[source]().drop_duplicates(subset="fips").set_index("fips")
+    # Stored files are read back exactly (pandas' default float parser can be off by an ulp),
+    # so unchanged values neither diff as changed nor shift when the files are rewritten
+    inputs = load_and_standardize_df(inputs_path, float_precision="round_trip").set_index("fips")
+    columns = [col for col in new_df.columns if col in inputs.columns]
+
+    # Align the refreshed table to the stored rows the way the left merge in main.py would
+    aligned = new_df.reindex(inputs.index)[columns]
+    changed = pd.DataFrame({col: _changed_mask(aligned[col], inputs[col]) for col in columns}, index=inputs.index)
+    changed_cols = [col for col in columns if changed[col].any()]
+    changed_rows = changed[changed_cols].any(axis=1)
+    if not changed_cols:
+        print(f"No changes in '{source}'")
+        return [], 0
+    if set(changed_cols) & set(OUTLIER_COLUMNS):
+        raise ValueError(f"'{source}' changed {', '.join(set(changed_cols) & set(OUTLIER_COLUMNS))}, "
+                         "which sets the outlier bounds for every county; rerun main.py instead")
+
+    for col in changed_cols:
+        if isinstance(inputs[col].dtype, pd.CategoricalDtype):
+            inputs[col] = inputs[col].astype(object)
+        inputs.loc[changed_rows, col] = aligned.loc[changed_rows, col]
+
+    derived = [col for col, deps in METRIC_DEPENDENCIES.items() if set(deps) & set(changed_cols)]
+    rows = changed_rows
+    if any(set(METRIC_DEPENDENCIES[col]) & STATE_MEDIAN_COLUMNS for col in derived):
+        # Missing rents and incomes are filled with state medians, so every county in the state must be present
+        rows = inputs["state_fips"].isin(inputs.loc[changed_rows, "state_fips"])
+    # The stored inputs precede outlier nulling; the outlier columns are unchanged, so the bounds match main.py
+    nulled = nullify_outliers_minimally(inputs.copy(), OUTLIER_COLUMNS)
+    with profile_stage("metrics", nulled[rows]) as stage:
+        recomputed = stage.output = calculate_affordability_metrics(nulled[rows].reset_index()).set_index("fips")
+
+    with profile_stage("load", label=final_path) as stage:
+        final = stage.output = pd.read_csv(final_path, dtype={'fips': str}, float_precision="round_trip")
+    final_order = list(final.columns)
+    final = final.set_index("fips")
+    updates = [col for col in FINAL_COLUMNS if col in final.columns and (col in derived or col in changed_cols)]
+    targets = format_fips(recomputed.index)
+    for col in updates:
+        source_values = recomputed[col] if col in derived else nulled.loc[rows, col]
+        if isinstance(final[col].dtype, pd.CategoricalDtype):
+            final[col] = final[col].astype(object)
+        final.loc[targets, col] = source_values.to_numpy()
+
+    with profile_stage("write", [inputs, final], label=f"{inputs_path}, {final_path}"):
+        inputs.reset_index().assign(fips=lambda df: format_fips(df['fips'])).to_csv(inputs_path, index=False)
+        final.reset_index()[final_order].to_csv(final_path, index=False)
+    print(f"Updated {len(updates)} columns for {int(rows.sum())} counties from '{source}': {', '.join(updates)}")
+    return updates, int(rows.sum())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute only the metrics affected by one refreshed source table")
+    parser.add_argument("source", choices=sorted(SOURCES))
+    parser.add_argument("--notify", help="Base URL of a running dashboard to refresh, e.g. http://127.0.0.1:7860")
+    add_profile_argument(parser, "incremental")
+    args = parser.parse_args()
+
+    with PipelineProfiler(f"incremental:{args.source}", args.profile):
+        updates, _ = incremental_update(args.source)
+    if updates and args.notify:
+        headers = {"X-Refresh-Token": os.getenv("REFRESH_TOKEN", "")}
+        response = requests.post(f"{args.notify}/api/refresh", json={"columns": updates}, headers=headers, timeout=30)
+        print(f"Dashboard refresh: {response.status_code}")
@@ -1,15 +1,77 @@
+import argparse
 import pandas as pd
 import numpy as np
+from compaction import compact_frame, format_fips
+from profiling import PipelineProfiler, profile_stage, add_profile_argument
 
 # Function to load and standardize FIPS
-def load_and_standardize_df(file_path, fips_col="fips"):
+def load_and_standardize_df(file_path, fips_col="fips", float_precision=None):
     """
     Loads a CSV and ensures FIPS is a zero-padded string.
+    Pass float_precision="round_trip" for files this pipeline wrote and will rewrite.
     """
-    df = pd.read_csv(file_path)
-    df[fips_col] = df[fips_col].astype(str).str.zfill(5)
+    with profile_stage("load", label=file_path) as stage:
+        df = stage.output = pd.read_csv(file_path, float_precision=float_precision)
+    with profile_stage("standardize", df, label=file_path) as stage:
+        df[fips_col] = df[fips_col].astype(str).str.zfill(5)
+        # Only keys and names are narrowed; the metrics are computed from the values as read
+        df, _ = compact_frame(df, file_path, numeric=False)
+        stage.output = df
     return df
 
+def load_census_df(file_path="data/county_census_data.csv"):
+    """
+    Loads the ACS county table without the columns the FMR table provides.
+    """
+    census_df = load_and_standardize_df(file_path)
+    return census_df.drop(['state_fips', 'median_gross_rent', 'total_vacant_housing_units', 'county_fips', 'median_household_income', 'NAME'], axis = 1)
+
+def load_fmr_df(file_path="data/census_fmr_county.csv"):
+    """
+    Loads the HUD FMR county table keyed by fips.
+    """
+    with profile_stage("load", label=file_path) as stage:
+        fmr_df = stage.output = pd.read_csv(file_path)
+    with profile_stage("standardize", fmr_df, label=file_path) as stage:
+        fmr_df["GEOID"] = fmr_df["GEOID"].astype(str).str.zfill(5)  # Assuming GEOID is fips equivalent
+        fmr_df.rename(columns={"GEOID": "fips"}, inplace=True)
+        fmr_df = fmr_df.drop_duplicates(subset="fips")
+        fmr_df, _ = compact_frame(fmr_df, file_path, numeric=False)
+        stage.output = fmr_df
+    return fmr_df
+
+# Source tables merged onto the census table, in merge order
+SOURCES = {
+    "census": lambda: load_census_df("data/county_census_data.csv"),
+    "school": lambda: load_and_standardize_df("data/seda_county_2019.csv"),
+    "unemployment": lambda: load_and_standardize_df("data/national_county_bls_unemployment.csv"),
+    "zillow": lambda: load_and_standardize_df("data/county_zhvi_data.csv"),
+    "crime": lambda: load_and_standardize_df("data/fuzzy_matched_crime_data.csv"),
+    "fmr": lambda: load_fmr_df("data/census_fmr_county.csv"),
+}
+
+INPUTS_PATH = "data/county_metric_inputs.csv"
+FINAL_PATH = "data/final_county_metrics.csv"
+
+FINAL_COLUMNS = [
+    'fmr_0', 'fmr_1', 'fmr_2', 'fmr_3', 'fmr_4', 'geometry', 
+    'rent_to_income_ratio_0', 'rent_to_income_ratio_1', 
+    'rent_to_income_ratio_2', 'rent_to_income_ratio_3', 'rent_to_income_ratio_4', 
+    'pct_cost_burdened', 'pct_severe_cost_burdened', 
+    'fmr_vs_median_rent_diff_0', 'fmr_vs_median_rent_percent_0', 
+    'fmr_vs_median_rent_diff_1', 'fmr_vs_median_rent_percent_1', 
+    'fmr_vs_median_rent_diff_2', 'fmr_vs_median_rent_percent_2', 
+    'fmr_vs_median_rent_diff_3', 'fmr_vs_median_rent_percent_3', 
+    'fmr_vs_median_rent_diff_4', 'fmr_vs_median_rent_percent_4', 
+    'affordability_gap_0', 'affordability_gap_1', 'affordability_gap_2', 
+    'affordability_gap_3', 'affordability_gap_4', 
+    'voucher_feasibility_0', 'voucher_feasibility_1', 
+    'voucher_feasibility_2', 'voucher_feasibility_3', 'voucher_feasibility_4',
+    'vacancy_to_population_ratio', 'population_in_poverty', 'stability_index', 
+    'education_to_income', 'school_achievement_score'
+    , 'unemployment_rate', 'value_to_income_ratio', 'poverty_to_rent_burden', 'state_name', 'county_name', 'Crime_Rate', 'fips'
+]
+
 # Function to calculate affordability metrics
 def calculate_affordability_metrics(df):
     """
@@ -108,6 +170,38 @@ def calculate_affordability_metrics(df):
 
     return df
 
+# Input columns each metric computed by calculate_affordability_metrics reads
+COST_BURDEN_COLUMNS = ["rent_30_to_34_9_percent", "rent_35_to_39_9_percent", "rent_40_to_49_9_percent",
+                       "rent_50_percent_or_more", "total_renter_households_cost"]
+METRIC_DEPENDENCIES = {
+    "school_achievement_score": ["school_achievement_score"],
+    "unemployment_rate": ["unemployment_rate"],
+    "rent_to_income_ratio": ["median_gross_rent", "median_household_income"],
+    "pct_cost_burdened": COST_BURDEN_COLUMNS,
+    "pct_cost_burdened_proxy": ["median_gross_rent", "median_household_income", "renters_50percent_plus_income", "total_population"],
+    "pct_severe_cost_burdened": ["renters_50percent_plus_income", "total_population"],
+    "housing_wage": ["median_gross_rent"],
+    "value_to_income_ratio": ["median_value_owner_occupied", "median_household_income"],
+    "poverty_to_rent_burden": ["population_in_poverty", "median_gross_rent"],
+    "vacancy_to_population_ratio": ["total_vacant_housing_units", "total_population"],
+    "education_to_income": ["population_25plus_bachelors", "population_25plus_total", "median_household_income"],
+    "stability_index": ["population_same_residence_1yr", "total_population"],
+}
+for beds in range(5):
+    METRIC_DEPENDENCIES.update({
+        f"rent_to_income_ratio_{beds}": [f"fmr_{beds}", "median_household_income"],
+        f"fmr_vs_median_rent_percent_{beds}": [f"fmr_{beds}", "median_gross_rent"],
+        f"affordability_gap_{beds}": [f"fmr_{beds}", "median_household_income"],
+        f"voucher_feasibility_{beds}": [f"fmr_{beds}", "median_gross_rent"],
+        f"housing_wage_{beds}": [f"fmr_{beds}"],
+        f"housing_wage_to_min_wage_{beds}": [f"fmr_{beds}", "min_wage"],
+    })
+
+# Missing values in these are filled with state medians, so changes affect every county in the state
+STATE_MEDIAN_COLUMNS = {"median_gross_rent", "median_household_income"}
+# Outlier bounds use whole-column quartiles
+OUTLIER_COLUMNS = ['median_household_income', 'median_value_owner_occupied']
+
 
 def nullify_outliers_minimally(df, columns, threshold=3.0):
     for col in columns:
@@ -120,53 +214,37 @@ def nullify_outliers_minimally(df, columns, threshold=3.0):
     return df
 
 if __name__ == "__main__":
-    # Load and standardize datasets
-    crime_df = load_and_standardize_df("data/fuzzy_matched_crime_data.csv")
-    unemployment_df = load_and_standardize_df("data/national_county_bls_unemployment.csv")
-    school_score_df = load_and_standardize_df("data/seda_county_2019.csv")
-    zillow_home_value_df = load_and_standardize_df("data/county_zhvi_data.csv")
-    census_df = load_and_standardize_df("data/county_census_data.csv")
-    census_df = census_df.drop(['state_fips', 'median_gross_rent', 'total_vacant_housing_units', 'county_fips', 'median_household_income', 'NAME'], axis = 1)
-    fmr_df = pd.read_csv("data/census_fmr_county.csv")
-    fmr_df["GEOID"] = fmr_df["GEOID"].astype(str).str.zfill(5)  # Assuming GEOID is fips equivalent
-    fmr_df.rename(columns={"GEOID": "fips"}, inplace=True)
-    fmr_df = fmr_df.drop_duplicates(subset="fips")
-    # Merge datasets
-    merged_df = census_df.merge(school_score_df, on="fips", how="left")
-    merged_df_v1 = merged_df.merge(unemployment_df, on="fips", how="left")
-    merged_df_v2 = merged_df_v1.merge(zillow_home_value_df, on="fips", how="left")
-    merged_df_v3 = merged_df_v2.merge(crime_df, on="fips", how="left")
-    merged_df_v4 = merged_df_v3.merge(fmr_df, on="fips", how="left")
-
-   
-
-
-    final_df = nullify_outliers_minimally(merged_df_v4, ['median_household_income', 'median_value_owner_occupied'])
-
-    final_df = calculate_affordability_metrics(merged_df_v4)
-
-
-
-    cols = [
-        'fmr_0', 'fmr_1', 'fmr_2', 'fmr_3', 'fmr_4', 'geometry', 
-        'rent_to_income_ratio_0', 'rent_to_income_ratio_1', 
-        'rent_to_income_ratio_2', 'rent_to_income_ratio_3', 'rent_to_income_ratio_4', 
-        'pct_cost_burdened', 'pct_severe_cost_burdened', 
-        'fmr_vs_median_rent_diff_0', 'fmr_vs_median_rent_percent_0', 
-        'fmr_vs_median_rent_diff_1', 'fmr_vs_median_rent_percent_1', 
-        'fmr_vs_median_rent_diff_2', 'fmr_vs_median_rent_percent_2', 
-        'fmr_vs_median_rent_diff_3', 'fmr_vs_median_rent_percent_3', 
-        'fmr_vs_median_rent_diff_4', 'fmr_vs_median_rent_percent_4', 
-        'affordability_gap_0', 'affordability_gap_1', 'affordability_gap_2', 
-        'affordability_gap_3', 'affordability_gap_4', 
-        'voucher_feasibility_0', 'voucher_feasibility_1', 
-        'voucher_feasibility_2', 'voucher_feasibility_3', 'voucher_feasibility_4',
-        'vacancy_to_population_ratio', 'population_in_poverty', 'stability_index', 
-        'education_to_income', 'school_achievement_score'
-        , 'unemployment_rate', 'value_to_income_ratio', 'poverty_to_rent_burden', 'state_name', 'county_name' ,'geometry','Crime_Rate', 'fips'
-    ]
-
-    final_df_v1 = final_df[cols]
-    final_df_v1.to_csv("data/final_county_metrics.csv", index=False)
-    
-    print("Merged data with metrics saved to 'data/final_county_metrics.csv'")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Merge the source tables and compute the county metrics")
+    add_profile_argument(parser, "main")
+    args = parser.parse_args()
+
+    with PipelineProfiler("main", args.profile):
+        # Load and standardize datasets
+        sources = {name: load() for name, load in SOURCES.items()}
+
+        # Merge datasets
+        with profile_stage("merge", sources) as stage:
+            merged_df = sources["census"]
+            for name in ["school", "unemployment", "zillow", "crime", "fmr"]:
+                merged_df = merged_df.merge(sources[name], on="fips", how="left")
+            stage.output = merged_df
+
+        # Keep the merged inputs as the sources provided them, before outlier nulling, so single-source
+        # refreshes can diff against them and recompute only what changed (see incremental.py)
+        with profile_stage("write", merged_df, label=INPUTS_PATH):
+            merged_df.assign(fips=format_fips(merged_df['fips'])).to_csv(INPUTS_PATH, index=False)
+
+        with profile_stage("outlier", merged_df) as stage:
+            merged_df = stage.output = nullify_outliers_minimally(merged_df, OUTLIER_COLUMNS)
+
+        with profile_stage("metrics", merged_df) as stage:
+            final_df = stage.output = calculate_affordability_metrics(merged_df)
+
+        with profile_stage("write", final_df, label=FINAL_PATH) as stage:
+            final_df_v1 = final_df[FINAL_COLUMNS]
+            # fips are integer keys in memory; write them back as zero-padded strings
+            final_df_v1 = final_df_v1.assign(fips=format_fips(final_df_v1['fips']))
+            final_df_v1.to_csv(FINAL_PATH, index=False)
+            stage.output = final_df_v1
+
+        print(f"Merged data with metrics saved to '{FINAL_PATH}'")
@@ -0,0 +1,113 @@
+import hashlib
+import functools
+import numpy as np
+import pandas as pd
+from county_data import load_data, metric_column, METRIC_INFO, NUMERIC_COLS, BEDROOM_TYPES
+from compaction import format_fips
+
+def _column_values(series):
+    """Column as a NaN-filled numpy array, keeping float32 metrics narrow"""
+    dtype = 'float32' if series.dtype == 'float32' else 'float64'
+    return series.to_numpy(dtype=dtype, na_value=np.nan)
+
+def _clean_float32(values):
+    """float32 values as float64 rounded to the 7 significant digits float32 actually holds"""
+    values = values.astype('float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = 10.0 ** (6 - np.floor(np.log10(np.abs(values))))
+    scale[~np.isfinite(scale)] = 1
+    return np.round(values * scale) / scale
+
+class MetricTable:
+    """In-memory, fips-indexed columnar copy of the county metrics for batch lookups"""
+
+    def __init__(self, gdf):
+        df = gdf.assign(fips_key=pd.to_numeric(gdf['fips'], errors='coerce'))
+        df = df.dropna(subset=['fips_key']).drop_duplicates(subset='fips_key')
+        # Integer fips keys make the batch lookup a single hash-index probe
+        self.index = pd.Index(df['fips_key'].astype('int64').to_numpy())
+        self.fips = format_fips(df['fips'])
+        self.state_name = df['state_name'].to_numpy(dtype=object)
+        self.county_name = df['county_name'].to_numpy(dtype=object)
+        self.columns = {col: _column_values(df[col]) for col in NUMERIC_COLS if col in df.columns}
+        self.version = self._fingerprint()
+
+    def __len__(self):
+        return len(self.fips)
+
+    def _fingerprint(self):
+        """Content hash of the table, used as the base of every ETag"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update("|".join(self.fips).encode())
+        for col in sorted(self.columns):
+            digest.update(col.encode())
+            digest.update(np.ascontiguousarray(self.columns[col]).tobytes())
+        return digest.hexdigest()
+
+    def update_columns(self, frame):
+        """Replace columns from a frame indexed by integer fips and refresh the table version"""
+        for col in frame.columns:
+            values = frame[col].reindex(self.index)
+            if col in ('state_name', 'county_name'):
+                setattr(self, col, values.to_numpy(dtype=object))
+            elif col in self.columns:
+                self.columns[col] = _column_values(values)
+        self.version = self._fingerprint()
+
+    def resolve_metrics(self, metrics, bedroom_type="2-Bedroom"):
+        """Map METRIC_INFO names or raw column names to (output name, column) pairs"""
+        if bedroom_type not in BEDROOM_TYPES:
+            raise ValueError(f"Unknown bedroom type: {bedroom_type}")
+        resolved = []
+        for metric in metrics:
+            if metric in METRIC_INFO:
+                column = metric_column(metric, bedroom_type)
+            else:
+                column = metric
+            if column not in self.columns:
+                raise ValueError(f"Unknown metric: {metric}")
+            resolved.append((metric, column))
+        return resolved
+
+    def positions(self, fips_list=None, states=None):
+        """Return row positions for the requested fips (all rows if None) and the fips not found"""
+        if fips_list is None:
+            positions = np.arange(len(self))
+            missing = []
+        else:
+            # Only plain codes of up to five digits are fips; anything else ("1001.7", "-1") is reported missing
+            fips_strings = pd.Series(fips_list, dtype=object).astype(str).str.strip()
+            valid = fips_strings.str.fullmatch(r"[0-9]{1,5}").to_numpy(dtype=bool)
+            fips_keys = np.full(len(fips_strings), -1, dtype=np.int64)
+            fips_keys[valid] = fips_strings[valid].astype('int64').to_numpy()
+            positions = self.index.get_indexer(fips_keys)
+            found = positions >= 0
+            missing = [fips for fips, ok in zip(fips_list, found) if not ok]
+            positions = positions[found]
+        if states:
+            positions = positions[np.isin(self.state_name[positions], list(states))]
+        return positions, missing
+
+    def values(self, column, positions):
+        """Column values at the given positions with NaN mapped to None for serialization"""
+        values = self.columns[column][positions]
+        if values.dtype == 'float32':
+            values = _clean_float32(values)
+        values = values.astype(object)
+        values[pd.isna(values)] = None
+        return values
+
+    def records(self, positions, resolved, chunk_size=5000):
+        """Yield lists of row dicts in chunks so large responses can be streamed"""
+        for start in range(0, len(positions), chunk_size):
+            chunk = positions[start:start + chunk_size]
+            keys = ['fips', 'state_name', 'county_name'] + [name for name, _ in resolved]
+            cols = [self.fips[chunk], self.state_name[chunk], self.county_name[chunk]] + \
+                [self.values(column, chunk) for _, column in resolved]
+            yield [dict(zip(keys, row)) for row in zip(*cols)]
+
+@functools.lru_cache(maxsize=None)
+def get_metric_table():
+    """Build the metric table once per process from the cached dashboard data"""
+    gdf, _ = load_data()
+    return MetricTable(gdf)
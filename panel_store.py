@@ -0,0 +1,92 @@
+import os
+import functools
+import numpy as np
+import pandas as pd
+from compaction import format_fips
+
+PANEL_PATH = "data/county_panels.npz"
+
+# Time series written by the source scripts: (metric, path, period column, value column)
+PANEL_SOURCES = [
+    ("unemployment_rate", "data/national_county_bls_unemployment_series.csv", "period", "unemployment_rate"),
+    ("median_zhvi_county", "data/county_zhvi_series.csv", "period", "median_zhvi_county"),
+    ("Crime_Rate", "data/crime_rate_by_county_series.csv", "period", "Crime_Rate"),
+]
+
+PANEL_LABELS = {
+    "unemployment_rate": "Unemployment Rate",
+    "median_zhvi_county": "Median Home Value (ZHVI)",
+    "Crime_Rate": "Crime Rate",
+}
+
+class PanelStore:
+    """
+    County x period float32 panels, one per metric with its own period axis. Each panel is
+    stored period-major (periods x counties) so a single period is one contiguous row, sliced in O(1).
+    """
+
+    def __init__(self, fips, panels):
+        self.fips = format_fips(fips)
+        self.periods = {metric: [str(period) for period in periods] for metric, (periods, _) in panels.items()}
+        self.period_positions = {
+            metric: {period: i for i, period in enumerate(periods)} for metric, periods in self.periods.items()
+        }
+        self.panels = {metric: np.ascontiguousarray(panel, dtype=np.float32) for metric, (_, panel) in panels.items()}
+
+    @classmethod
+    def from_long(cls, frames):
+        """Build a store from {metric: DataFrame(fips, period, value)} long tables on a shared county axis"""
+        frames = {
+            metric: df.assign(fips=format_fips(df['fips']), period=df['period'].astype(str))
+            for metric, df in frames.items()
+        }
+        fips = sorted(set().union(*(df['fips'] for df in frames.values())))
+        panels = {}
+        for metric, df in frames.items():
+            wide = (
+                df.pivot_table(index='period', columns='fips', values='value', aggfunc='mean')
+                .sort_index()
+                .reindex(columns=fips)
+            )
+            panels[metric] = (wide.index.tolist(), wide.to_numpy(dtype=np.float32))
+        return cls(fips, panels)
+
+    def slice(self, metric, period):
+        """Values of every county for one period (a view, no copy)"""
+        return self.panels[metric][self.period_positions[metric][period]]
+
+    def save(self, path=PANEL_PATH):
+        arrays = {}
+        for metric, panel in self.panels.items():
+            arrays[f"panel:{metric}"] = panel
+            arrays[f"periods:{metric}"] = np.asarray(self.periods[metric], dtype=str)
+        np.savez(path, fips=self.fips.astype(str), **arrays)
+
+    @classmethod
+    def load(cls, path=PANEL_PATH):
+        with np.load(path) as data:
+            metrics = [key.split(":", 1)[1] for key in data.files if key.startswith("panel:")]
+            panels = {metric: (data[f"periods:{metric}"].tolist(), data[f"panel:{metric}"]) for metric in metrics}
+            return cls(data['fips'], panels)
+
+@functools.lru_cache(maxsize=None)
+def get_panel_store():
+    """Load the panel store once per process; None if the panels have not been built"""
+    if not os.path.exists(PANEL_PATH):
+        return None
+    return PanelStore.load(PANEL_PATH)
+
+if __name__ == "__main__":
+    frames = {}
+    for metric, path, period_col, value_col in PANEL_SOURCES:
+        if not os.path.exists(path):
+            print(f"Skipping {metric}: '{path}' not found")
+            continue
+        df = pd.read_csv(path, dtype={'fips': str})
+        frames[metric] = df[['fips', period_col, value_col]].rename(columns={period_col: 'period', value_col: 'value'})
+
+    store = PanelStore.from_long(frames)
+    store.save(PANEL_PATH)
+    for metric, periods in store.periods.items():
+        print(f"{metric}: {len(store.fips)} counties x {len(periods)} periods ({periods[0]} to {periods[-1]})")
+    print(f"Saved {len(store.panels)} panels to '{PANEL_PATH}'")
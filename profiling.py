@@ -0,0 +1,204 @@
+import sys
+import json
+import time
+import datetime
+import contextlib
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is reported as null there
+    resource = None
+
+# The profiler of the running --profile pipeline, if any, so library code can mark stages without passing it around
+_active = None
+
+def add_profile_argument(parser, name):
+    """Add the --profile [REPORT] flag shared by the pipeline scripts"""
+    parser.add_argument(
+        "--profile", nargs="?", const=f"data/profile_{name}.json", metavar="REPORT",
+        help=f"Record per-stage time and memory and write a JSON report (default: data/profile_{name}.json)"
+    )
+
+def _proc_status_mb(field):
+    """A memory field of /proc/self/status (VmRSS, VmHWM) in MB; None off Linux"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS mark (VmHWM) so the next reading covers one stage; False where unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (from getrusage; unaware of VmHWM resets)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _shape(data):
+    """(rows, columns) of a DataFrame, or the totals over a list or dict of them"""
+    if data is None:
+        return None, None
+    frames = list(data.values()) if isinstance(data, dict) else data if isinstance(data, (list, tuple)) else [data]
+    return sum(len(frame) for frame in frames), sum(frame.shape[1] if frame.ndim > 1 else 1 for frame in frames)
+
+def _top_allocators(before, after, top_n):
+    """Largest net allocations between two snapshots by allocating line, ignoring the profiler's own"""
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+    return [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_mb": round(stat.size_diff / 1024 ** 2, 3),
+            "count": stat.count_diff,
+        }
+        for stat in stats[:top_n]
+    ]
+
+class Stage:
+    """Handle yielded by a stage; set output to the stage's result so its shape is recorded"""
+    output = None
+
+class PipelineProfiler:
+    """
+    Records wall time, CPU time, RSS change and peak (per stage on Linux), traced memory and the
+    top allocating lines for each stage of a pipeline run. Disabled (no tracing, no report) when report_path is None.
+    """
+
+    def __init__(self, name, report_path=None, top_n=5):
+        self.name = name
+        self.report_path = report_path
+        self.top_n = top_n
+        self.stages = []
+        self.process_peak_mb = 0.0
+
+    @property
+    def enabled(self):
+        return self.report_path is not None
+
+    def process_peak_rss_mb(self):
+        """Peak RSS of the whole run; VmHWM is reset per stage, so its readings are folded in here"""
+        hwm = _proc_status_mb("VmHWM")
+        if hwm is None:
+            return peak_rss_mb()
+        self.process_peak_mb = max(self.process_peak_mb, hwm)
+        return self.process_peak_mb
+
+    def __enter__(self):
+        global _active
+        if self.enabled:
+            _active = self
+            self.started = datetime.datetime.now().isoformat(timespec="seconds")
+            self.wall_start = time.perf_counter()
+            self.cpu_start = time.process_time()
+            # Tracing slows allocation-heavy code and snapshots add time between stages,
+            # so timings are comparable between --profile runs only
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        if self.enabled:
+            _active = None
+            self.wall_s = time.perf_counter() - self.wall_start
+            self.cpu_s = time.process_time() - self.cpu_start
+            tracemalloc.stop()
+            self.write(self.report_path)
+            self.print_summary()
+        return False
+
+    @contextlib.contextmanager
+    def stage(self, name, data_in=None, label=None):
+        """Profile the enclosed block as one stage; data_in is the frame(s) it starts from"""
+        stage = Stage()
+        if not self.enabled:
+            yield stage
+            return
+        rows_in, cols_in = _shape(data_in)
+        before = tracemalloc.take_snapshot()
+        if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+; older versions report the run's peak so far
+            tracemalloc.reset_peak()
+        self.process_peak_rss_mb()
+        peak_reset = _reset_peak_rss()
+        rss_start = _proc_status_mb("VmRSS")
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            current, peak = tracemalloc.get_traced_memory()
+            rss_end = _proc_status_mb("VmRSS")
+            stage_peak = _proc_status_mb("VmHWM") if peak_reset else None
+            self.process_peak_rss_mb()
+            after = tracemalloc.take_snapshot()
+            rows_out, cols_out = _shape(stage.output)
+            self.stages.append({
+                "stage": name,
+                "label": label,
+                "wall_s": round(wall, 4),
+                "cpu_s": round(cpu, 4),
+                "rss_start_mb": rss_start,
+                "rss_end_mb": rss_end,
+                "rss_delta_mb": round(rss_end - rss_start, 1) if rss_start is not None else None,
+                "stage_peak_rss_mb": stage_peak,
+                "process_peak_rss_mb": self.process_peak_rss_mb(),
+                "traced_peak_mb": round(peak / 1024 ** 2, 2),
+                "traced_current_mb": round(current / 1024 ** 2, 2),
+                "rows_in": rows_in, "cols_in": cols_in,
+                "rows_out": rows_out, "cols_out": cols_out,
+                "top_allocators": _top_allocators(before, after, self.top_n),
+            })
+
+    def report(self):
+        return {
+            "pipeline": self.name,
+            "started": self.started,
+            "python": sys.version.split()[0],
+            "wall_s": round(self.wall_s, 4),
+            "cpu_s": round(self.cpu_s, 4),
+            "process_peak_rss_mb": self.process_peak_rss_mb(),
+            "stages": self.stages,
+        }
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def print_summary(self):
+        print(f"\nProfile of '{self.name}' ({self.wall_s:.2f}s wall, {self.cpu_s:.2f}s CPU, "
+              f"process peak RSS {self.process_peak_rss_mb()} MB):")
+        print(f"{'stage':<34}{'wall s':>9}{'cpu s':>9}{'peak MB':>9}{'RSS +MB':>9}{'traced MB':>11}  rows x cols in -> out")
+        for stage in self.stages:
+            name = f"{stage['stage']} ({stage['label']})" if stage['label'] else stage['stage']
+            shape_in = f"{stage['rows_in']} x {stage['cols_in']}" if stage['rows_in'] is not None else "-"
+            shape_out = f"{stage['rows_out']} x {stage['cols_out']}" if stage['rows_out'] is not None else "-"
+            stage_peak = f"{stage['stage_peak_rss_mb']:.1f}" if stage['stage_peak_rss_mb'] is not None else "-"
+            rss_delta = f"{stage['rss_delta_mb']:+.1f}" if stage['rss_delta_mb'] is not None else "-"
+            print(f"{name[:33]:<34}{stage['wall_s']:>9.3f}{stage['cpu_s']:>9.3f}{stage_peak:>9}{rss_delta:>9}"
+                  f"{stage['traced_peak_mb']:>11.2f}  {shape_in} -> {shape_out}")
+        slowest = max(self.stages, key=lambda stage: stage['wall_s'], default=None)
+        if slowest and slowest['top_allocators']:
+            top = slowest['top_allocators'][0]
+            print(f"Top allocator in slowest stage '{slowest['stage']}': {top['location']} "
+                  f"({top['size_mb']} MB)")
+        print(f"Report saved to '{self.report_path}'")
+
+def profile_stage(name, data_in=None, label=None):
+    """Stage of the active --profile run, or a no-op outside one"""
+    if _active is None:
+        return contextlib.nullcontext(Stage())
+    return _active.stage(name, data_in, label)
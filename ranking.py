@@ -0,0 +1,74 @@
+import functools
+import numpy as np
+import pandas as pd
+from metric_table import get_metric_table
+
+class RankIndex:
+    """Precomputed national and within-state sort orders and percentile ranks for every metric column"""
+
+    def __init__(self, table):
+        self.table = table
+        self.states, self.state_codes = np.unique(table.state_name.astype(str), return_inverse=True)
+        self.order = {}            # column -> positions sorted ascending, NaN excluded
+        self.state_order = {}      # column -> {state: positions sorted ascending}
+        self.percentile = {}       # column -> national percentile rank (0-100)
+        self.state_percentile = {} # column -> within-state percentile rank (0-100)
+        for column in table.columns:
+            self.build(column)
+
+    def build(self, column):
+        """(Re)compute the sort orders and percentile ranks of one column"""
+        values = self.table.columns[column]
+        valid = np.flatnonzero(~np.isnan(values))
+        self.order[column] = valid[np.argsort(values[valid], kind='stable')]
+
+        # Sort by (state, value) once and split at the state boundaries
+        by_state = valid[np.lexsort((values[valid], self.state_codes[valid]))]
+        bounds = np.searchsorted(self.state_codes[by_state], np.arange(1, len(self.states)))
+        self.state_order[column] = dict(zip(self.states, np.split(by_state, bounds)))
+
+        series = pd.Series(values)
+        self.percentile[column] = (series.rank(pct=True) * 100).to_numpy()
+        self.state_percentile[column] = (series.groupby(self.state_codes).rank(pct=True) * 100).to_numpy()
+
+    def top_k(self, column, k, state=None, ascending=False):
+        """Positions of the k highest (or lowest) counties, O(k) from the precomputed order"""
+        if state:
+            if state not in self.state_order[column]:
+                raise ValueError(f"Unknown state: {state}")
+            order = self.state_order[column][state]
+        else:
+            order = self.order[column]
+        if ascending:
+            return order[:k]
+        return order[::-1][:k]
+
+def top_k_values(values, k, positions=None, ascending=False):
+    """Positions of the k highest (or lowest) non-NaN values of an ad-hoc array, via argpartition"""
+    values = np.asarray(values, dtype=float)
+    positions = np.arange(len(values)) if positions is None else np.asarray(positions)
+    positions = positions[~np.isnan(values[positions])]
+    keys = values[positions] if ascending else -values[positions]
+    if k < len(positions):
+        candidates = np.argpartition(keys, k)[:k]
+    else:
+        candidates = np.arange(len(positions))
+    return positions[candidates[np.argsort(keys[candidates], kind='stable')]]
+
+@functools.lru_cache(maxsize=None)
+def get_rank_index():
+    """Build the rank index once per process from the metric table"""
+    return RankIndex(get_metric_table())
+
+def rank_counties(metric, bedroom_type="2-Bedroom", k=20, state=None, ascending=False):
+    """Top-k (or bottom-k) counties for a METRIC_INFO name or raw column, optionally within one state"""
+    index = get_rank_index()
+    table = index.table
+    (name, column), = table.resolve_metrics([metric], bedroom_type)
+    positions = index.top_k(column, k, state, ascending)
+    records = [record for chunk in table.records(positions, [(name, column)]) for record in chunk]
+    for rank, (record, position) in enumerate(zip(records, positions), start=1):
+        record['rank'] = rank
+        record['national_percentile'] = float(index.percentile[column][position])
+        record['state_percentile'] = float(index.state_percentile[column][position])
+    return records
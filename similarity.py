@@ -0,0 +1,82 @@
+import functools
+import numpy as np
+from metric_table import get_metric_table
+
+DEFAULT_FEATURES = [
+    'Rent-to-Income Ratio', 'Unemployment Rate', 'School Achievement', 'Crime Rate',
+    'Value to Income Ratio', 'Cost Burden', 'Education to Income', 'Poverty to Rent Burden'
+]
+
+class SimilarityIndex:
+    """Standardized float32 feature matrix over every metric column for nearest-neighbour search"""
+
+    def __init__(self, table):
+        self.table = table
+        self.features = list(table.columns)
+        self.feature_positions = {column: i for i, column in enumerate(self.features)}
+        matrix = np.column_stack([table.columns[column] for column in self.features]).astype(np.float32)
+        self.valid, self.matrix = self._standardize(matrix)
+
+    @staticmethod
+    def _standardize(matrix):
+        """Missing-value mask and z-scored matrix with missing values zeroed"""
+        mean = np.nanmean(matrix, axis=0)
+        std = np.nanstd(matrix, axis=0)
+        std[~(std > 0)] = 1  # Constant or empty columns contribute nothing
+        standardized = (matrix - mean) / std
+        # Missing values are kept as a mask and zeroed so the distance loop stays branch-free
+        valid = ~np.isnan(standardized)
+        return valid, np.ascontiguousarray(np.where(valid, standardized, 0), dtype=np.float32)
+
+    def update(self, column):
+        """Re-standardize one column after its values changed in the metric table"""
+        i = self.feature_positions[column]
+        valid, standardized = self._standardize(self.table.columns[column].astype(np.float32)[:, None])
+        self.valid[:, i] = valid[:, 0]
+        self.matrix[:, i] = standardized[:, 0]
+
+    def neighbors(self, position, k=10, columns=None, weights=None):
+        """Positions and distances of the k nearest rows to the row at position"""
+        cols = [self.feature_positions[column] for column in (columns or self.features)]
+        weights = np.ones(len(cols), dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+        features = self.matrix[:, cols]
+        shared = self.valid[:, cols] & self.valid[position, cols]
+
+        # Weighted squared distance over the features both rows have, rescaled to the full weight
+        sq_dist = (np.square(features - features[position]) * shared) @ weights
+        shared_weight = shared @ weights
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dist = np.sqrt(sq_dist / shared_weight * weights.sum())
+        dist[~(shared_weight > 0)] = np.inf
+        dist[position] = np.inf
+
+        k = min(k, len(dist) - 1)
+        candidates = np.argpartition(dist, k)[:k]
+        candidates = candidates[np.argsort(dist[candidates], kind='stable')]
+        candidates = candidates[np.isfinite(dist[candidates])]
+        return candidates, dist[candidates]
+
+@functools.lru_cache(maxsize=None)
+def get_similarity_index():
+    """Build the similarity index once per process from the metric table"""
+    return SimilarityIndex(get_metric_table())
+
+def similar_counties(fips, k=10, metrics=None, weights=None, bedroom_type="2-Bedroom"):
+    """Nearest counties to fips over a METRIC_INFO / raw column feature subset with optional weights"""
+    index = get_similarity_index()
+    table = index.table
+    resolved = table.resolve_metrics(metrics or DEFAULT_FEATURES, bedroom_type)
+    if weights is not None and len(weights) != len(resolved):
+        raise ValueError("weights must match the number of metrics")
+    if weights is not None and (min(weights) < 0 or sum(weights) <= 0):
+        raise ValueError("weights must be non-negative with at least one positive weight")
+    if k < 1:
+        raise ValueError("k must be at least 1")
+    positions, _ = table.positions([fips])
+    if len(positions) == 0:
+        raise ValueError(f"Unknown fips: {fips}")
+    neighbors, distances = index.neighbors(positions[0], k, [column for _, column in resolved], weights)
+    records = [record for chunk in table.records(neighbors, resolved) for record in chunk]
+    for record, distance in zip(records, distances):
+        record['distance'] = float(distance)
+    return records
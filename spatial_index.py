@@ -0,0 +1,104 @@
+import json
+import functools
+import hashlib
+import numpy as np
+import shapely
+from shapely.strtree import STRtree
+from county_data import load_data
+from metric_table import get_metric_table
+from compaction import format_fips
+
+class CountySpatialIndex:
+    """STRtree over the county polygons for point-in-county and bounding box queries"""
+
+    def __init__(self, gdf, table):
+        self.geometry = np.asarray(gdf.geometry.values, dtype=object)
+        self.tree = STRtree(self.geometry)
+        self.bounds = shapely.bounds(self.geometry)
+        self.version = hashlib.blake2b(self.bounds.tobytes(), digest_size=16).hexdigest()
+        self.state_name = gdf['state_name'].to_numpy(dtype=object)
+        # Feature ids and fips properties for the viewport GeoJSON; geometry is serialized from the polygons on demand
+        self.feature_ids = gdf.index.astype(str).to_numpy(dtype=object)
+        self.fips = fips = format_fips(gdf['fips'])
+        # Map each polygon (row of gdf) to its row in the metric table, -1 if it has no usable fips
+        self.table_positions = table.index.get_indexer(
+            np.asarray([int(f) if str(f).isdigit() else -1 for f in fips], dtype='int64')
+        )
+        # And the reverse: the polygon of each metric table row, None where there is none
+        self.table_geometry = np.full(len(table), None, dtype=object)
+        found = self.table_positions >= 0
+        self.table_geometry[self.table_positions[found]] = self.geometry[found]
+
+    def lookup_points(self, lons, lats):
+        """Return the polygon position containing each point, -1 where no county contains it"""
+        points = shapely.points(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+        point_idx, geom_idx = self.tree.query(points, predicate='intersects')
+        # Points on a shared border hit several counties; keep the lowest position for a stable answer
+        result = np.full(len(points), len(self.geometry), dtype='int64')
+        np.minimum.at(result, point_idx, geom_idx)
+        result[result == len(self.geometry)] = -1
+        return result
+
+    def query_boxes(self, boxes):
+        """Return, for each (minx, miny, maxx, maxy) box, the positions of the polygons it intersects"""
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        if len(boxes) == 0:
+            return []
+        box_idx, geom_idx = self.tree.query(shapely.box(*boxes.T), predicate='intersects')
+        # Bulk query results are grouped by input box
+        return np.split(geom_idx, np.searchsorted(box_idx, np.arange(1, len(boxes))))
+
+    def state_bounds(self, state):
+        """[minx, miny, maxx, maxy] of all counties in a state"""
+        bounds = self.bounds[self.state_name == state]
+        return [bounds[:, 0].min(), bounds[:, 1].min(), bounds[:, 2].max(), bounds[:, 3].max()]
+
+    def viewport_geojson(self, bounds=None):
+        """GeoJSON text with only the features intersecting the viewport bounds (all features if None)"""
+        positions = np.arange(len(self.geometry)) if bounds is None else np.sort(self.query_boxes([bounds])[0])
+        # Only the fips property is kept so the GeoJSON stays small on the wire
+        features = ", ".join(
+            '{"type": "Feature", "id": %s, "properties": {"fips": %s}, "geometry": %s}'
+            % (json.dumps(feature_id), json.dumps(fips), geometry or "null")
+            for feature_id, fips, geometry in zip(
+                self.feature_ids[positions], self.fips[positions], shapely.to_geojson(self.geometry[positions])
+            )
+        )
+        return '{"type": "FeatureCollection", "features": [' + features + ']}'
+
+@functools.lru_cache(maxsize=None)
+def get_spatial_index():
+    """Build the spatial index once per process from the cached dashboard data"""
+    gdf, _ = load_data()
+    return CountySpatialIndex(gdf, get_metric_table())
+
+def _records(table_positions, resolved):
+    """Metric records for table positions, with an empty fips record where nothing matched"""
+    table = get_metric_table()
+    records = [{'fips': None} for _ in range(len(table_positions))]
+    found = np.flatnonzero(table_positions >= 0)
+    matched = [record for chunk in table.records(table_positions[found], resolved) for record in chunk]
+    for i, record in zip(found, matched):
+        records[i] = record
+    return records
+
+def points_to_counties(lons, lats, metrics=(), bedroom_type="2-Bedroom"):
+    """Batched point-to-county lookup returning fips and metrics for every (lon, lat) pair"""
+    index = get_spatial_index()
+    resolved = get_metric_table().resolve_metrics(metrics, bedroom_type)
+    positions = index.lookup_points(lons, lats)
+    table_positions = np.where(positions >= 0, index.table_positions[positions], -1)
+    records = _records(table_positions, resolved)
+    for record, lon, lat in zip(records, lons, lats):
+        record['lon'], record['lat'] = lon, lat
+    return records
+
+def counties_in_boxes(boxes, metrics=(), bedroom_type="2-Bedroom"):
+    """Batched viewport query returning fips and metrics of the counties intersecting each box"""
+    index = get_spatial_index()
+    resolved = get_metric_table().resolve_metrics(metrics, bedroom_type)
+    results = []
+    for positions in index.query_boxes(boxes):
+        table_positions = index.table_positions[np.sort(positions)]
+        results.append(_records(table_positions[table_positions >= 0], resolved))
+    return results
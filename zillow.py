@@ -1,27 +1,58 @@
+import re
+import argparse
 import pandas as pd  
+from profiling import PipelineProfiler, profile_stage, add_profile_argument
 
 if __name__ == "__main__":
-    # Load the Zillow ZIP-level dataset
-    zillow_df = pd.read_csv("data/Zip_zhvi_uc_sfrcondo_tier_0.33_0.67_sm_sa_month.csv")
+    parser = argparse.ArgumentParser(description="Aggregate ZIP-level ZHVI to counties")
+    add_profile_argument(parser, "zillow")
+    args = parser.parse_args()
 
-    zillow_df_v1 = zillow_df[['RegionID', 'CountyName', '2025-01-31']]
+    with PipelineProfiler("zillow", args.profile):
+        with profile_stage("load", label="data/Zip_zhvi_uc_sfrcondo_tier_0.33_0.67_sm_sa_month.csv") as stage:
+            # Load the Zillow ZIP-level dataset
+            zillow_df = stage.output = pd.read_csv("data/Zip_zhvi_uc_sfrcondo_tier_0.33_0.67_sm_sa_month.csv")
 
-    # Aggregate ZIP-level ZHVI to county level by taking the median home value per county
-    county_zhvi = (
-        zillow_df_v1
-        .groupby('RegionID')  # Group by county
-        .agg({
-            '2025-01-31': 'median'  # Use median ZHVI across ZIPs in each county
-        })
-        .reset_index()
-        .rename(columns={'2025-01-31': 'median_zhvi_county'})  # Rename for clarity
-    )
+        with profile_stage("metrics", zillow_df, label="latest month") as stage:
+            zillow_df_v1 = zillow_df[['RegionID', 'CountyName', '2025-01-31']]
 
-    county_zhvi.rename(columns = {'RegionID': 'fips', '2025-01-31':'median_zhvi'}, inplace = True)
+            # Aggregate ZIP-level ZHVI to county level by taking the median home value per county
+            county_zhvi = (
+                zillow_df_v1
+                .groupby('RegionID')  # Group by county
+                .agg({
+                    '2025-01-31': 'median'  # Use median ZHVI across ZIPs in each county
+                })
+                .reset_index()
+                .rename(columns={'2025-01-31': 'median_zhvi_county'})  # Rename for clarity
+            )
 
-    county_zhvi['fips'] = county_zhvi['fips'].astype('str').str.zfill(5)
+            county_zhvi.rename(columns = {'RegionID': 'fips', '2025-01-31':'median_zhvi'}, inplace = True)
 
+            county_zhvi['fips'] = county_zhvi['fips'].astype('str').str.zfill(5)
+            stage.output = county_zhvi
 
-    # Save to CSV for integration with other data
-    county_zhvi.to_csv("data/county_zhvi_data.csv", index=False)
-    print("Data saved to 'county_zhvi_data.csv'")
\ No newline at end of file
+        with profile_stage("write", county_zhvi, label="data/county_zhvi_data.csv"):
+            # Save to CSV for integration with other data
+            county_zhvi.to_csv("data/county_zhvi_data.csv", index=False)
+            print("Data saved to 'county_zhvi_data.csv'")
+
+        with profile_stage("metrics", zillow_df, label="monthly series") as stage:
+            # Monthly county series for the time-series panels (see panel_store.py)
+            date_cols = [col for col in zillow_df.columns if re.fullmatch(r"\d{4}-\d{2}-\d{2}", col)]
+            county_series = (
+                zillow_df
+                .groupby('RegionID')[date_cols]
+                .median()
+                .reset_index()
+                .melt(id_vars='RegionID', var_name='period', value_name='median_zhvi_county')
+                .dropna(subset=['median_zhvi_county'])
+                .rename(columns={'RegionID': 'fips'})
+            )
+            county_series['fips'] = county_series['fips'].astype('str').str.zfill(5)
+            county_series['period'] = county_series['period'].str[:7]  # 2025-01-31 -> 2025-01
+            stage.output = county_series
+
+        with profile_stage("write", county_series, label="data/county_zhvi_series.csv"):
+            county_series.to_csv("data/county_zhvi_series.csv", index=False)
+            print("Monthly series saved to 'county_zhvi_series.csv'")